@@ -4,10 +4,18 @@ import pandas as pd
 from collections import Counter
 import re
 from backend.parser import WebParser
+from backend.browser.driver_pool import ChromeDriverPool
+from backend.domains.engine_router import EngineRouter
+from backend.cache.disk_cache import DiskCache
+from backend.cache.http_cache import HTTPCache
 from backend.gemini_handler import GeminiHandler
+from backend.llm.metrics import REGISTRY as LLM_METRICS
+from backend.llm.response_cache import LLMResponseCache
 from backend.rag.rag_engine import RAGEngine
+from backend.rag.chunker import Chunker
+from backend.archive.snapshot_store import SnapshotStore
 from backend.archive.wayback_analyzer import WaybackAnalyzer
-from backend.ui import section_title, badge
+from backend.ui import section_title, badge, call_timing_caption
 
 
 # =========================
@@ -127,17 +135,55 @@ input, textarea, select {
 </style>
 """, unsafe_allow_html=True)
 
+# =========================
+# Shared resources
+# =========================
+# One instance per server process: every Streamlit session shares the
+# same on-disk caches, learned routes and headless browsers instead of
+# opening its own
+@st.cache_resource
+def shared_caches():
+    return {
+        "router": EngineRouter(path=os.path.join(".cache", "engine_routes.json"), autosave_every=1),
+        "http": HTTPCache(os.path.join(".cache", "http.sqlite")),
+        "llm": LLMResponseCache(os.path.join(".cache", "llm.sqlite")),
+        # Capture indexes change slowly; refetch at most daily
+        "cdx": DiskCache(
+            os.path.join(".cache", "cdx.sqlite"), max_bytes=16 * 1024 * 1024, ttl=24 * 3600
+        ),
+        "snapshots": SnapshotStore(os.path.join(".cache", "snapshots.sqlite")),
+        # Browsers start on first Selenium scrape and are shut down at exit
+        "drivers": ChromeDriverPool(size=2)
+    }
+
+
+caches = shared_caches()
+
 # =========================
 # Session State
 # =========================
+if "parser" not in st.session_state:
+    st.session_state.parser = WebParser(
+        router=caches["router"],
+        http_cache=caches["http"],
+        driver_pool=caches["drivers"]
+    )
 if "scraped_data" not in st.session_state:
     st.session_state.scraped_data = None
 if "gemini_handler" not in st.session_state:
     st.session_state.gemini_handler = None
+if "llm_cache" not in st.session_state:
+    st.session_state.llm_cache = caches["llm"]
 if "rag_engine" not in st.session_state:
-    st.session_state.rag_engine = None
+    st.session_state.rag_engine = RAGEngine(hybrid=True, chunker=Chunker())
+if "current_url" not in st.session_state:
+    st.session_state.current_url = None
 if "wayback" not in st.session_state:
     st.session_state.wayback = None
+if "cdx_cache" not in st.session_state:
+    st.session_state.cdx_cache = caches["cdx"]
+if "snapshot_store" not in st.session_state:
+    st.session_state.snapshot_store = caches["snapshots"]
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
@@ -182,6 +228,7 @@ with st.sidebar:
 
     if st.session_state.scraped_data:
         if st.button("Clear Session"):
+            st.session_state.parser.close()
             for k in list(st.session_state.keys()):
                 del st.session_state[k]
             st.rerun()
@@ -201,20 +248,34 @@ with col2:
 # =========================
 if scrape_button and url:
     with st.spinner("Scraping website..."):
-        parser = WebParser()
+        parser = st.session_state.parser
         result = parser.scrape(url, use_selenium=use_selenium)
 
         if result["success"]:
             st.session_state.scraped_data = result
-            st.session_state.rag_engine = RAGEngine(result["content"], result["links"])
-            st.session_state.wayback = WaybackAnalyzer(url)
+            st.session_state.current_url = url
+            st.session_state.rag_engine.add_document(
+                url, result["content"], result["links"], title=result["title"]
+            )
+            st.session_state.wayback = WaybackAnalyzer(
+                url,
+                session=parser.session,
+                index_cache=st.session_state.cdx_cache,
+                snapshot_store=st.session_state.snapshot_store
+            )
 
             if api_key:
-                st.session_state.gemini_handler = GeminiHandler(api_key)
+                st.session_state.gemini_handler = GeminiHandler(
+                    api_key,
+                    rag_engine=st.session_state.rag_engine,
+                    response_cache=st.session_state.llm_cache,
+                    history_token_budget=2000
+                )
                 st.session_state.gemini_handler.set_context(
                     result["content"],
                     result["title"],
-                    result["description"]
+                    result["description"],
+                    url=url
                 )
 
             st.markdown(
@@ -246,20 +307,28 @@ if st.session_state.scraped_data:
 
     with tab2:
         if st.session_state.gemini_handler:
+            force_refresh = st.checkbox("Regenerate (ignore cached summary)", value=False)
             if st.button("📝 Generate Summary"):
-                summary_result = st.session_state.gemini_handler.summarize()
-                if "response" in summary_result:
-                    st.write(summary_result["response"])
-                else:
-                    st.error(f"Summary failed: {summary_result.get('error', 'Unknown error')}")
+                handler = st.session_state.gemini_handler
+                try:
+                    st.write_stream(handler.stream_summary(force_refresh=force_refresh))
+                    st.caption(call_timing_caption(handler.last_call))
+                except Exception as e:
+                    st.error(f"Summary failed: {e}")
         else:
             st.info("Provide an LLM API key to enable AI analysis.")
 
     with tab3:
+        rag = st.session_state.rag_engine
+        search_all = st.checkbox(
+            f"Search all scraped pages ({len(rag.documents)})",
+            value=False
+        )
+
         question = st.chat_input("Ask a question about this website...")
         if question:
-            rag = st.session_state.rag_engine
-            rag_result = rag.build_answer(question)
+            scope = None if search_all else st.session_state.current_url
+            rag_result = rag.build_answer(question, url=scope)
 
             if rag_result["success"]:
                 st.markdown("### ✅ Answer")
@@ -395,14 +464,16 @@ if st.session_state.scraped_data:
                             Write a short research-style explanation.
                             """
 
-                            insight = st.session_state.gemini_handler.ask_question(prompt)
-
-                            # Robust handling: check for "response" key without explicitly checking "success"
-                            if insight and isinstance(insight, dict) and "response" in insight:
-                                st.write(insight["response"])
-                            else:
-                                error_msg = insight.get("error") if insight else "Unknown error"
-                                st.warning(f"AI insight generation failed: {error_msg}")
+                            handler = st.session_state.gemini_handler
+                            try:
+                                st.write_stream(handler.stream_question(
+                                    prompt,
+                                    single_turn=True,
+                                    template_id="archive_insights"
+                                ))
+                                st.caption(call_timing_caption(handler.last_call))
+                            except Exception as e:
+                                st.warning(f"AI insight generation failed: {e}")
 
                     else:
                         st.error(result["error"])
@@ -422,6 +493,33 @@ else:
     </div>
     """, unsafe_allow_html=True)
 
+# =========================
+# SIDEBAR: LLM USAGE
+# =========================
+# Rendered last so it includes the calls made during this run
+with st.sidebar:
+    usage = LLM_METRICS.summary()
+    if usage:
+        with st.expander("📊 LLM usage", expanded=False):
+            usage_df = pd.DataFrame(usage)
+            st.metric("Estimated cost", f"${usage_df['cost_usd'].sum():.4f}")
+            st.dataframe(
+                usage_df[["feature", "calls", "cache_hits", "prompt_tokens",
+                          "response_tokens", "avg_ms", "cost_usd"]],
+                hide_index=True,
+                use_container_width=True
+            )
+            st.download_button(
+                "Download call log (JSONL)",
+                LLM_METRICS.to_jsonl(),
+                file_name="llm_calls.jsonl"
+            )
+            st.download_button(
+                "Download metrics (Prometheus)",
+                LLM_METRICS.to_prometheus(),
+                file_name="llm_metrics.prom"
+            )
+
 # =========================
 # FOOTER
 # =========================
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import re
+import zlib
+
+from backend.cache.disk_cache import DiskCache
+
+
+_ARCHIVE_URL = re.compile(r"^https?://web\.archive\.org/web/(\d{4,14})[a-z_]*/(.+)$")
+
+
+def parse_archive_url(archive_url):
+    """(timestamp, original_url) of a Wayback capture URL, or None"""
+    match = _ARCHIVE_URL.match(archive_url)
+    return (match.group(1), match.group(2)) if match else None
+
+
+class SnapshotStore:
+    """
+    Permanent local store for Wayback captures.
+
+    A capture at a given timestamp never changes, so entries are keyed by
+    a hash of (timestamp, URL) and never expire; the DiskCache size cap
+    evicts least recently used entries. Each capture holds the
+    zlib-compressed raw HTML and any number of named extracted views
+    (text, keyword counts, ...) so repeat analyses skip both the network
+    and the parser. Bump a view name when its extraction logic changes.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.store = DiskCache(path, max_bytes=max_bytes, ttl=None)
+
+    @staticmethod
+    def key(timestamp, url):
+        return hashlib.sha256(f"{timestamp} {url}".encode("utf-8")).hexdigest()
+
+    def _get(self, kind, timestamp, url):
+        value = self.store.get(f"{kind}:{self.key(timestamp, url)}")
+        return zlib.decompress(value) if value is not None else None
+
+    def _set(self, kind, timestamp, url, data):
+        self.store.set(f"{kind}:{self.key(timestamp, url)}", zlib.compress(data, 6))
+
+    # --------------------------------------------------
+    # Raw HTML
+    # --------------------------------------------------
+    def get_html(self, timestamp, url):
+        data = self._get("html", timestamp, url)
+        return data.decode("utf-8") if data is not None else None
+
+    def put_html(self, timestamp, url, html):
+        self._set("html", timestamp, url, html.encode("utf-8"))
+
+    # --------------------------------------------------
+    # Extracted views
+    # --------------------------------------------------
+    def get_view(self, timestamp, url, name):
+        data = self._get(f"view:{name}", timestamp, url)
+        return json.loads(data) if data is not None else None
+
+    def put_view(self, timestamp, url, name, view):
+        self._set(f"view:{name}", timestamp, url, json.dumps(view).encode("utf-8"))
+
+    # --------------------------------------------------
+    # Lookups
+    # --------------------------------------------------
+    def get_json(self, name):
+        return self.store.get_json(f"meta:{name}")
+
+    def set_json(self, name, value):
+        self.store.set_json(f"meta:{name}", value)
+
+    @property
+    def stats(self):
+        return self.store.stats
+
+    def size_bytes(self):
+        return self.store.size_bytes()
+
+    def close(self):
+        self.store.close()
@@ -1,14 +1,51 @@
 import requests
-from collections import Counter
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
 from bs4 import BeautifulSoup
 import re
 
+from backend.archive.snapshot_store import parse_archive_url
+
+
+# Capture indexes already fetched in this process, keyed by URL, as
+# (fetched_at, timestamps)
+_INDEX_MEMO = OrderedDict()
+_INDEX_MEMO_SIZE = 64
+_INDEX_LOCK = threading.Lock()
+
 
 class WaybackAnalyzer:
+    """
+    Compare archived versions of a page across years.
+
+    The capture index for the URL (one capture per month, HTTP 200 only)
+    is fetched from the CDX API once and reused for `index_ttl` seconds,
+    from memory and, with an `index_cache` (DiskCache), from disk; both
+    expire relative to the original fetch. Snapshot
+    lookups bisect the sorted timestamps, so any number of years or
+    months costs a single index request.
+
+    analyze() downloads and parses snapshots on up to `max_workers`
+    threads (kept small to stay polite to web.archive.org); years not
+    finished within `deadline` seconds are left out of the comparison.
+
+    With a `snapshot_store` (SnapshotStore), downloaded captures and their
+    extracted text and keyword counts are kept permanently, so repeat
+    analyses are served from disk.
+    """
+
+    # Stored view name; bump when fetch_text/extract_keywords change
+    VIEW = "analyzer-v1"
 
     CDX_API = "https://web.archive.org/cdx/search/cdx"
+    FIRST_YEAR = 1996
 
-    def __init__(self, url):
+    def __init__(self, url, session=None, timeout=20, index_cache=None, index_ttl=24 * 3600,
+                 max_workers=3, deadline=45, snapshot_store=None):
 
         url = url.strip()
 
@@ -20,53 +57,159 @@ class WaybackAnalyzer:
 
         self.url = url
 
+        # Shared keep-alive session (e.g. WebParser.session); falls back
+        # to plain module-level requests when none is given.
+        self.session = session or requests
+        self.timeout = timeout
+        self.index_cache = index_cache
+        self.index_ttl = index_ttl
+        self.max_workers = max_workers
+        self.deadline = deadline
+        self.snapshot_store = snapshot_store
+        self._timestamps = None
+        self._fetched_at = 0.0
+
 
     # --------------------------------------------------
-    # Get closest snapshot to requested year
+    # Capture index (single CDX request per URL)
     # --------------------------------------------------
-    def get_snapshot_for_year(self, year):
+    def _fetch_index(self):
+
+        params = {
+            "url": self.url,
+            "output": "json",
+            "fl": "timestamp",
+            "filter": "statuscode:200",
+            "collapse": "timestamp:6",
+            "from": str(self.FIRST_YEAR),
+            "to": str(datetime.now().year)
+        }
 
-        try:
+        r = self.session.get(self.CDX_API, params=params, timeout=self.timeout)
 
-            params = {
-                "url": self.url,
-                "matchType": "prefix",
-                "output": "json",
-                "fl": "timestamp,original,statuscode",
-                "filter": "statuscode:200",
-                "limit": 200
-            }
+        if r.status_code != 200:
+            return None
 
-            r = requests.get(self.CDX_API, params=params, timeout=20)
+        data = r.json()
 
-            if r.status_code != 200:
-                return None
+        # First row is the field header
+        return sorted(row[0] for row in data[1:] if row and row[0].isdigit())
+
+    def snapshot_timestamps(self):
+        """Sorted capture timestamps (YYYYMMDDhhmmss), or None if unavailable"""
+
+        now = time.time()
+
+        if self._timestamps is not None and now - self._fetched_at <= self.index_ttl:
+            return self._timestamps
 
-            data = r.json()
+        with _INDEX_LOCK:
+            memo = _INDEX_MEMO.get(self.url)
+            if memo is not None and now - memo[0] <= self.index_ttl:
+                _INDEX_MEMO.move_to_end(self.url)
+                self._fetched_at, self._timestamps = memo
+                return self._timestamps
 
-            if len(data) <= 1:
+        key = f"cdx:{self.url}"
+        entry = self.index_cache.get_json(key) if self.index_cache is not None else None
+
+        # The fetch time travels with the entry so a copy loaded from disk
+        # doesn't outlive the original
+        if isinstance(entry, dict) and now - entry.get("fetched_at", 0) <= self.index_ttl:
+            fetched_at, timestamps = entry["fetched_at"], entry["timestamps"]
+        else:
+            try:
+                timestamps = self._fetch_index()
+            except Exception:
+                timestamps = None
+
+            # Failures aren't cached so the next call retries
+            if timestamps is None:
                 return None
 
-            rows = data[1:]
+            fetched_at = now
 
-            closest_timestamp = None
-            closest_diff = 9999
+            if self.index_cache is not None:
+                self.index_cache.set_json(key, {"fetched_at": fetched_at, "timestamps": timestamps})
 
-            for row in rows:
+        with _INDEX_LOCK:
+            _INDEX_MEMO[self.url] = (fetched_at, timestamps)
+            _INDEX_MEMO.move_to_end(self.url)
+            while len(_INDEX_MEMO) > _INDEX_MEMO_SIZE:
+                _INDEX_MEMO.popitem(last=False)
 
-                timestamp = row[0]
-                snap_year = int(timestamp[:4])
+        self._fetched_at = fetched_at
+        self._timestamps = timestamps
+        return timestamps
 
-                diff = abs(snap_year - year)
 
-                if diff < closest_diff:
-                    closest_diff = diff
-                    closest_timestamp = timestamp
+    # --------------------------------------------------
+    # Get closest snapshot to requested year (or month)
+    # --------------------------------------------------
+    @staticmethod
+    def _period(year, month=None):
 
-            if not closest_timestamp:
-                return None
+        if month:
+            start = datetime(year, month, 1)
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+            return f"{year:04d}{month:02d}", start, end
+
+        return f"{year:04d}", datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+    def closest_timestamp(self, year, month=None):
+        """
+        Earliest capture within the year (or month); failing that, the
+        capture nearest to that period. None without an index.
+        """
+
+        timestamps = self.snapshot_timestamps()
+
+        if not timestamps:
+            return None
+
+        prefix, start, end = self._period(year, month)
+
+        i = bisect_left(timestamps, prefix)
+
+        if i < len(timestamps) and timestamps[i].startswith(prefix):
+            return timestamps[i]
+
+        before = timestamps[i - 1] if i > 0 else None
+        after = timestamps[i] if i < len(timestamps) else None
+
+        if before is None or after is None:
+            return before or after
+
+        before_gap = start - datetime.strptime(before[:8], "%Y%m%d")
+        after_gap = datetime.strptime(after[:8], "%Y%m%d") - end
+
+        return before if before_gap <= after_gap else after
+
+    def get_snapshot_for_year(self, year, month=None):
+
+        try:
+
+            # The capture chosen for a period that has ended is settled,
+            # so those lookups are kept in the snapshot store and repeat
+            # analyses don't need the index at all
+            prefix, _, end = self._period(year, month)
+            store = self.snapshot_store if end <= datetime.now() else None
+            lookup = f"capture:{prefix}:{self.url}"
+
+            timestamp = store.get_json(lookup) if store is not None else None
+
+            if timestamp is None:
+                timestamp = self.closest_timestamp(year, month)
+
+                if not timestamp:
+                    return None
+
+                # An earlier capture chosen because none follows could
+                # still lose to a future one; anything else is final
+                if store is not None and timestamp >= prefix:
+                    store.set_json(lookup, timestamp)
 
-            archive_url = f"https://web.archive.org/web/{closest_timestamp}/{self.url}"
+            archive_url = f"https://web.archive.org/web/{timestamp}/{self.url}"
 
             return archive_url
 
@@ -77,16 +220,68 @@ class WaybackAnalyzer:
     # --------------------------------------------------
     # Fetch archived HTML text
     # --------------------------------------------------
-    def fetch_text(self, archive_url):
+    def fetch_html(self, archive_url):
+
+        capture = parse_archive_url(archive_url)
+        store = self.snapshot_store
+
+        if store is not None and capture:
+            html = store.get_html(*capture)
+            if html is not None:
+                return html
+
+        r = self.session.get(archive_url, timeout=self.timeout)
+
+        if r.status_code != 200:
+            return None
+
+        if store is not None and capture:
+            store.put_html(*capture, r.text)
+
+        return r.text
+
+    def snapshot_view(self, archive_url):
+        """Extracted text and keyword counts of a capture, or None"""
+
+        capture = parse_archive_url(archive_url)
+        store = self.snapshot_store
+
+        if store is not None and capture:
+            view = store.get_view(*capture, self.VIEW)
+            if view is not None:
+                return {"text": view["text"], "keywords": Counter(view["keywords"])}
 
         try:
+            html = self.fetch_html(archive_url)
+        except Exception:
+            return None
+
+        if html is None:
+            return None
+
+        text = self.html_to_text(html)
 
-            r = requests.get(archive_url, timeout=20)
+        if not text:
+            return None
+
+        view = {"text": text, "keywords": self.extract_keywords(text)}
+
+        if store is not None and capture:
+            store.put_view(*capture, self.VIEW, {"text": text, "keywords": dict(view["keywords"])})
 
-            if r.status_code != 200:
-                return ""
+        return view
+
+    def fetch_text(self, archive_url):
 
-            soup = BeautifulSoup(r.text, "lxml")
+        view = self.snapshot_view(archive_url)
+
+        return view["text"] if view else ""
+
+    def html_to_text(self, html):
+
+        try:
+
+            soup = BeautifulSoup(html, "lxml")
 
             # 1. Decompose unwanted generic tags
             for tag in soup([
@@ -153,30 +348,67 @@ class WaybackAnalyzer:
     # --------------------------------------------------
     # Historical comparison
     # --------------------------------------------------
-    def analyze(self, years):
+    def _load_snapshot(self, archive_url):
+
+        # Text and keywords come pre-extracted (and stored) per capture
+        view = self.snapshot_view(archive_url)
 
-        snapshots = {}
+        if not view:
+            return None
 
-        for y in years:
+        return {
+            "url": archive_url,
+            "text": view["text"],
+            "keywords": view["keywords"]
+        }
 
+    def load_snapshots(self, years):
+        """
+        Fetch and parse the snapshot for each year concurrently.
+        Returns {year: snapshot} in year order; years without a capture,
+        whose fetch failed or that missed the deadline are omitted.
+        """
+
+        # Index lookups are in-memory after the first one, and past
+        # years come from the snapshot store
+        targets = {}
+        for y in sorted(set(years)):
             snap = self.get_snapshot_for_year(y)
+            if snap:
+                targets[y] = snap
 
-            if not snap:
-                continue
+        if not targets:
+            return {}
 
-            text = self.fetch_text(snap)
+        # Nearby years can resolve to the same capture; fetch it once
+        urls = list(dict.fromkeys(targets.values()))
 
-            if not text:
-                continue
-            
-            # Pre-extract keywords for each snapshot
-            keywords = self.extract_keywords(text)
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(urls))))
+        futures = {pool.submit(self._load_snapshot, u): u for u in urls}
 
-            snapshots[y] = {
-                "url": snap,
-                "text": text,
-                "keywords": keywords
-            }
+        done, _ = wait(futures, timeout=self.deadline)
+
+        # Don't wait for stragglers; their results are discarded
+        pool.shutdown(wait=False, cancel_futures=True)
+
+        loaded = {}
+        for future in done:
+            try:
+                snapshot = future.result()
+            except Exception:
+                snapshot = None
+            if snapshot:
+                loaded[futures[future]] = snapshot
+
+        return {
+            y: loaded[snap]
+            for y, snap in targets.items()
+            if snap in loaded
+        }
+
+    def analyze(self, years):
+
+        snapshots = self.load_snapshots(years)
 
         if len(snapshots) < 2:
             return {
@@ -1,9 +1,25 @@
+import datetime
+
 import requests
 from bs4 import BeautifulSoup
 
+from backend.archive.snapshot_store import parse_archive_url
+
 WAYBACK_API = "https://archive.org/wayback/available"
 
-def fetch_snapshot(url, year):
+# Stored view name; bump when the text extraction below changes
+VIEW = "compare-v1"
+
+
+def _closest_snapshot(url, year, store=None):
+    # The closest capture to Jan 1 of a past year is settled, so those
+    # lookups are kept in the store; the current year may still change
+    lookup = f"closest:{year}:{url}"
+    if store is not None and year < datetime.date.today().year:
+        cached = store.get_json(lookup)
+        if cached is not None:
+            return cached
+
     params = {
         "url": url,
         "timestamp": f"{year}0101"
@@ -14,16 +30,40 @@ def fetch_snapshot(url, year):
     if not snapshot:
         return None
 
-    snap_url = snapshot["url"]
-    html = requests.get(snap_url, timeout=10).text
+    if store is not None and year < datetime.date.today().year:
+        store.set_json(lookup, snapshot["url"])
+    return snapshot["url"]
+
+
+def fetch_snapshot(url, year, store=None):
+    snap_url = _closest_snapshot(url, year, store)
+    if not snap_url:
+        return None
+
+    capture = parse_archive_url(snap_url) if store is not None else None
+    if capture:
+        view = store.get_view(*capture, VIEW)
+        if view is not None:
+            return view["text"]
+
+    html = store.get_html(*capture) if capture else None
+    if html is None:
+        html = requests.get(snap_url, timeout=10).text
+        if capture:
+            store.put_html(*capture, html)
+
     soup = BeautifulSoup(html, "html.parser")
-    return soup.get_text(separator=" ", strip=True)
+    text = soup.get_text(separator=" ", strip=True)
+
+    if capture:
+        store.put_view(*capture, VIEW, {"text": text})
+    return text
 
 
-def compare_years(url, years):
+def compare_years(url, years, store=None):
     texts = {}
     for y in years:
-        txt = fetch_snapshot(url, y)
+        txt = fetch_snapshot(url, y, store)
         if txt:
             texts[y] = txt
 
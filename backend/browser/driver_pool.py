@@ -0,0 +1,259 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+
+def default_chrome_options():
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1920,1080")
+    return chrome_options
+
+
+class ChromeDriverPool:
+    """
+    Pool of warm headless Chrome drivers.
+
+    Drivers are started lazily up to `size` and handed out one scrape at
+    a time. Between uses each driver is reset (extra tabs closed, cookies
+    and all storage of the last page's origins cleared, parked on
+    about:blank). A driver is recycled after `max_pages` scrapes, when
+    its process tree grows past `max_memory_mb`, when a scrape fails, or
+    when its state could not be fully cleared. All drivers are shut down
+    by close(), which also runs at interpreter exit.
+
+    `on_start(driver)` runs once on each new driver, e.g. to install
+    request blocking.
+    """
+
+    def __init__(self, size=2, max_pages=50, max_memory_mb=1024,
+                 options_factory=default_chrome_options, on_start=None):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.options_factory = options_factory
+        self.on_start = on_start
+
+        # Used as a stack: LIFO keeps the most recently used drivers hot.
+        # The condition is notified whenever a driver goes idle or a slot
+        # frees up, so waiters can take the driver or start a replacement
+        self._idle = []
+        self._lock = threading.Condition()
+        self._drivers = {}
+        self._starting = 0
+        self._closed = False
+
+        self.stats = {"started": 0, "recycled": 0, "served": 0, "reset_failures": 0}
+
+        atexit.register(self.close)
+
+    # --------------------------------------------------
+    # Checkout
+    # --------------------------------------------------
+    def acquire(self, timeout=None):
+        """
+        Check out an idle driver, starting one if the pool has room.
+        Raises queue.Empty if none becomes available within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+
+                if self._idle:
+                    return self._idle.pop()
+
+                if len(self._drivers) + self._starting < self.size:
+                    # Reserve the slot before the slow browser startup
+                    self._starting += 1
+                    break
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+
+                self._lock.wait(remaining)
+
+        driver = None
+        try:
+            driver = self._start_driver()
+            return driver
+
+        finally:
+            with self._lock:
+                self._starting -= 1
+                if driver is not None:
+                    self._drivers[id(driver)] = 0
+                    self.stats["started"] += 1
+                else:
+                    # Startup failed; let a waiter try in this slot
+                    self._lock.notify()
+
+    def release(self, driver, broken=False):
+        with self._lock:
+            pages = self._drivers.get(id(driver), 0) + 1
+            self._drivers[id(driver)] = pages
+            self.stats["served"] += 1
+
+        recycle = (
+            broken
+            or self._closed
+            or pages >= self.max_pages
+            or self._over_memory(driver)
+            or not self._reset(driver)
+        )
+
+        if recycle:
+            self._discard(driver)
+        else:
+            with self._lock:
+                self._idle.append(driver)
+                self._lock.notify()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        driver = self.acquire(timeout=timeout)
+        broken = False
+
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    # --------------------------------------------------
+    # Driver lifecycle
+    # --------------------------------------------------
+    def _start_driver(self):
+        driver = webdriver.Chrome(options=self.options_factory())
+
+        if self.on_start:
+            try:
+                self.on_start(driver)
+            except Exception:
+                driver.quit()
+                raise
+
+        return driver
+
+    @staticmethod
+    def _origin(url):
+        parts = urlparse(url or "")
+        if parts.scheme in ("http", "https") and parts.netloc:
+            return f"{parts.scheme}://{parts.netloc}"
+        return None
+
+    def _reset(self, driver):
+        """
+        Clear per-site state left by the last scrape. Returns False when
+        that fails, so the driver is recycled rather than reused dirty.
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+
+            # Read before leaving the page: storage is cleared per origin,
+            # so collect the page's own and those of its frames
+            urls = [driver.current_url] + (driver.execute_script(
+                "try { window.sessionStorage.clear(); } catch (e) {}"
+                "return Array.from(document.querySelectorAll('iframe[src]'), f => f.src);"
+            ) or [])
+            origins = {self._origin(url) for url in urls} - {None}
+
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for origin in sorted(origins):
+                # IndexedDB, Cache Storage, service workers, local storage
+                driver.execute_cdp_cmd(
+                    "Storage.clearDataForOrigin",
+                    {"origin": origin, "storageTypes": "all"}
+                )
+
+            driver.get("about:blank")
+            return True
+
+        except Exception:
+            with self._lock:
+                self.stats["reset_failures"] += 1
+            return False
+
+    def _discard(self, driver):
+        with self._lock:
+            self._drivers.pop(id(driver), None)
+            self.stats["recycled"] += 1
+            # The slot is free again: a waiter can start a replacement
+            self._lock.notify()
+
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _over_memory(self, driver):
+        if not self.max_memory_mb:
+            return False
+
+        rss_mb = self._process_tree_rss_mb(driver)
+        return rss_mb is not None and rss_mb > self.max_memory_mb
+
+    def _process_tree_rss_mb(self, driver):
+        """
+        Resident memory of chromedriver and its Chrome children, read
+        from /proc. Returns None where that is unavailable.
+        """
+        try:
+            root = driver.service.process.pid
+        except Exception:
+            return None
+
+        if not os.path.isdir(f"/proc/{root}"):
+            return None
+
+        total_kb = 0
+        stack = [root]
+
+        while stack:
+            pid = stack.pop()
+
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+                            break
+
+                with open(f"/proc/{pid}/task/{pid}/children") as f:
+                    stack.extend(int(c) for c in f.read().split())
+
+            except (OSError, ValueError):
+                continue
+
+        return total_kb / 1024
+
+    # --------------------------------------------------
+    # Shutdown
+    # --------------------------------------------------
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+
+        for driver in idle:
+            self._discard(driver)
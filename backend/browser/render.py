@@ -0,0 +1,159 @@
+import time
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from backend.browser.driver_pool import default_chrome_options
+
+
+# URL patterns (Network.setBlockedURLs wildcards) per resource type
+RESOURCE_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico", "*.bmp"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.ogg", "*.mp3", "*.wav", "*.m3u8", "*.mov"],
+    "stylesheet": ["*.css"]
+}
+
+DEFAULT_BLOCKED_DOMAINS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "adservice.google.com", "facebook.net",
+    "connect.facebook.net", "hotjar.com", "segment.io", "segment.com",
+    "mixpanel.com", "optimizely.com", "newrelic.com", "nr-data.net",
+    "scorecardresearch.com", "taboola.com", "outbrain.com", "criteo.com"
+]
+
+PAGE_STATS_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+var res = performance.getEntriesByType('resource');
+var bytes = nav ? (nav.transferSize || 0) : 0;
+for (var i = 0; i < res.length; i++) { bytes += res[i].transferSize || 0; }
+return [bytes, res.length];
+"""
+
+DOM_SIGNATURE_JS = """
+return document.getElementsByTagName('*').length + ':' +
+       (document.body ? document.body.innerText.length : 0);
+"""
+
+
+class RenderConfig:
+    """
+    Fast-render settings for Selenium scrapes.
+
+    block_resources  : resource types to block ("image", "font", "media",
+                       "stylesheet")
+    blocked_domains  : hosts whose requests are blocked (trackers, ads)
+    page_load_strategy : "eager" returns once the DOM is parsed instead of
+                       waiting for every subresource
+    wait_for_selector : CSS selector that must appear before reading
+    network_idle_ms  : no new resource loads for this long
+    dom_stable_ms    : DOM size and text length unchanged for this long
+    timeout          : upper bound for all readiness waits, in seconds
+    """
+
+    def __init__(self, block_resources=("image", "font", "media"),
+                 blocked_domains=DEFAULT_BLOCKED_DOMAINS, page_load_strategy="eager",
+                 wait_for_selector=None, network_idle_ms=None, dom_stable_ms=500,
+                 timeout=10, poll_interval=0.1):
+        self.block_resources = tuple(block_resources)
+        self.blocked_domains = list(blocked_domains)
+        self.page_load_strategy = page_load_strategy
+        self.wait_for_selector = wait_for_selector
+        self.network_idle_ms = network_idle_ms
+        self.dom_stable_ms = dom_stable_ms
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def blocked_url_patterns(self):
+        patterns = []
+        for resource in self.block_resources:
+            for pattern in RESOURCE_PATTERNS.get(resource, []):
+                # setBlockedURLs matches the whole URL, so versioned assets
+                # (font.woff2?v=4, app.css?h=abc) need their own pattern
+                patterns.append(pattern)
+                patterns.append(f"{pattern}?*")
+        for domain in self.blocked_domains:
+            patterns.append(f"*://{domain}/*")
+            patterns.append(f"*://*.{domain}/*")
+        return patterns
+
+    # --------------------------------------------------
+    # Driver setup
+    # --------------------------------------------------
+    def chrome_options(self):
+        options = default_chrome_options()
+        options.page_load_strategy = self.page_load_strategy
+
+        if "image" in self.block_resources:
+            options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+
+        return options
+
+    def prepare_driver(self, driver):
+        patterns = self.blocked_url_patterns()
+        if not patterns:
+            return
+
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+    # --------------------------------------------------
+    # Readiness
+    # --------------------------------------------------
+    def wait_until_ready(self, driver):
+        """
+        Block until every configured readiness condition holds or the
+        timeout passes. Returns False on timeout.
+        """
+        deadline = time.monotonic() + self.timeout
+
+        if self.wait_for_selector:
+            try:
+                WebDriverWait(driver, self.timeout, poll_frequency=self.poll_interval).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, self.wait_for_selector))
+                )
+            except Exception:
+                return False
+
+        if self.network_idle_ms:
+            script = "return performance.getEntriesByType('resource').length;"
+            if not self._wait_stable(driver, script, self.network_idle_ms, deadline):
+                return False
+
+        if self.dom_stable_ms:
+            if not self._wait_stable(driver, DOM_SIGNATURE_JS, self.dom_stable_ms, deadline):
+                return False
+
+        return True
+
+    def _wait_stable(self, driver, script, quiet_ms, deadline):
+        last = driver.execute_script(script)
+        stable_since = time.monotonic()
+
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            current = driver.execute_script(script)
+
+            if current != last:
+                last = current
+                stable_since = time.monotonic()
+            elif (time.monotonic() - stable_since) * 1000 >= quiet_ms:
+                return True
+
+        return False
+
+
+def page_stats(driver):
+    """
+    Bytes transferred (navigation + resources) and resource count from
+    the Resource Timing API. Cross-origin resources without
+    Timing-Allow-Origin report 0 bytes, so this is a lower bound.
+    """
+    try:
+        transferred, resources = driver.execute_script(PAGE_STATS_JS)
+        return {"bytes": int(transferred), "resources": int(resources)}
+    except Exception:
+        return {"bytes": None, "resources": None}
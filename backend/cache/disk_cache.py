@@ -0,0 +1,163 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """
+    Small SQLite-backed key/value store with TTL and size-bounded LRU
+    eviction.
+
+    Values are bytes; use get_json/set_json for JSON-serialisable data.
+    `ttl=None` keeps entries until they are evicted for space. Safe to
+    share between threads; the size cap is enforced against the total on
+    disk, so several instances (or processes) on one file share it.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # Transactions are opened explicitly (BEGIN IMMEDIATE) so the
+        # size check and eviction see other writers' committed entries
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    # --------------------------------------------------
+    # Access
+    # --------------------------------------------------
+    def get(self, key):
+        now = time.time()
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            value, created = row
+
+            if self.ttl is not None and now - created > self.ttl:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.stats["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value)
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created, accessed)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now)
+                )
+                self._evict()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def touch(self, key):
+        """Restart an entry's TTL without rewriting its value."""
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                "UPDATE entries SET created = ?, accessed = ? WHERE key = ?", (now, now, key)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def get_json(self, key):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key, value):
+        self.set(key, json.dumps(value).encode("utf-8"))
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT created FROM entries WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            return False
+        return self.ttl is None or time.time() - row[0] <= self.ttl
+
+    # --------------------------------------------------
+    # Housekeeping
+    # --------------------------------------------------
+    def _total_size(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict(self):
+        # Runs inside the write transaction, so the total includes every
+        # instance's entries
+        if self.max_bytes is None:
+            return
+
+        total = self._total_size()
+        if total <= self.max_bytes:
+            return
+
+        rows = self._db.execute("SELECT key, size FROM entries ORDER BY accessed ASC")
+
+        victims = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            total -= size
+        rows.close()
+
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in victims])
+        self.stats["evictions"] += len(victims)
+
+    def size_bytes(self):
+        with self._lock:
+            return self._total_size()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
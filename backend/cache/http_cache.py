@@ -0,0 +1,85 @@
+import json
+import threading
+import zlib
+
+from backend.cache.disk_cache import DiskCache
+
+
+class HTTPCache:
+    """
+    On-disk conditional-GET cache for static scrapes.
+
+    Stores each response body with its ETag / Last-Modified validators
+    and, per extraction engine, the parsed page. The next request for the
+    URL sends If-None-Match / If-Modified-Since; on 304 the cached parsed
+    page (or body) is served instead of downloading again.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.store = DiskCache(path, max_bytes=max_bytes, ttl=ttl)
+        self.stats = {"hits": 0, "misses": 0, "revalidations": 0, "stored": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    # --------------------------------------------------
+    # Lookup
+    # --------------------------------------------------
+    def lookup(self, url):
+        value = self.store.get(url)
+        if value is None:
+            self._count("misses")
+            return None
+
+        return json.loads(zlib.decompress(value))
+
+    def validators(self, entry):
+        headers = {}
+        if not entry:
+            return headers
+
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        if headers:
+            self._count("revalidations")
+        return headers
+
+    def hit(self, url):
+        self._count("hits")
+        self.store.touch(url)
+
+    def stale(self):
+        """The server sent a full response despite our validators."""
+        self._count("misses")
+
+    # --------------------------------------------------
+    # Store
+    # --------------------------------------------------
+    def save(self, url, entry):
+        self.store.set(url, zlib.compress(json.dumps(entry).encode("utf-8")))
+
+    def store_response(self, url, response, body, engine, page, truncated=False):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        # Without validators the entry could never be revalidated
+        if not etag and not last_modified:
+            return
+
+        self.save(url, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+            "truncated": truncated,
+            "pages": {engine: page}
+        })
+        self._count("stored")
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
@@ -0,0 +1,219 @@
+import posixpath
+import threading
+from itertools import islice
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+from backend.crawl.bloom import BloomFilter
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid"}
+
+SKIP_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".bmp",
+    ".pdf", ".zip", ".gz", ".tar", ".rar", ".7z", ".exe", ".dmg",
+    ".mp3", ".mp4", ".avi", ".mov", ".webm", ".css", ".js", ".json",
+    ".xml", ".woff", ".woff2", ".ttf"
+}
+
+
+def canonicalize_url(url):
+    """
+    Normalise a URL so trivially different spellings map to one key:
+    lowercase scheme/host, drop default ports, fragments and tracking
+    parameters, resolve dot segments and sort the query string.
+    """
+    parts = urlsplit(url.strip())
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+
+    netloc = host
+    if port and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+
+    path = parts.path or "/"
+    if "." in path or "//" in path:
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path)
+        if trailing and path != "/":
+            path += "/"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def site_of(url):
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class RobotsCache:
+    """
+    robots.txt rules per origin, fetched once through the parser session.
+    """
+
+    def __init__(self, session, user_agent, timeout=10):
+        self.session = session
+        self.user_agent = user_agent
+        self.timeout = timeout
+
+        self._rules = {}
+        self._lock = threading.Lock()
+
+    def _load(self, origin):
+        rules = RobotFileParser(f"{origin}/robots.txt")
+
+        try:
+            response = self.session.get(f"{origin}/robots.txt", timeout=self.timeout)
+
+            if response.status_code in (401, 403):
+                rules.disallow_all = True
+            elif response.status_code >= 400:
+                rules.allow_all = True
+            else:
+                rules.parse(response.text.splitlines())
+
+        except Exception:
+            rules.allow_all = True
+
+        return rules
+
+    def allowed(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+
+        with self._lock:
+            rules = self._rules.get(origin)
+
+        if rules is None:
+            rules = self._load(origin)
+            with self._lock:
+                self._rules[origin] = rules
+
+        return rules.can_fetch(self.user_agent, url)
+
+
+class SiteCrawler:
+    """
+    Breadth-first crawler built on WebParser.scrape_many.
+
+    Starting from seed URLs, each depth level is scraped concurrently and
+    the links it yields (via _extract_links) form the next level. Pages
+    stream out as (url, result) pairs as soon as they finish, so indexing
+    can start before the crawl ends.
+
+    Limits: `max_depth` link hops from the seeds, `max_pages` pages in
+    total. With `same_site` only hosts of the seeds (and their
+    subdomains) are followed. The seen-set is a Bloom filter by default
+    so very large crawls stay within a few MB.
+    """
+
+    def __init__(self, parser, max_depth=2, max_pages=100, same_site=True,
+                 respect_robots=True, concurrency=8, per_host=2, seen=None):
+        self.parser = parser
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_site = same_site
+        self.concurrency = concurrency
+        self.per_host = per_host
+
+        self.seen = seen if seen is not None else BloomFilter()
+
+        self.robots = None
+        if respect_robots:
+            self.robots = RobotsCache(
+                parser.session,
+                parser.headers.get("User-Agent", "*"),
+                timeout=parser.timeout
+            )
+
+        self.stats = {"pages": 0, "failed": 0, "robots_blocked": 0, "out_of_scope": 0}
+
+    # --------------------------------------------------
+    # Frontier filtering
+    # --------------------------------------------------
+    def _in_scope(self, url, sites):
+        parts = urlsplit(url)
+
+        if parts.scheme not in ("http", "https"):
+            return False
+
+        if posixpath.splitext(parts.path)[1].lower() in SKIP_EXTENSIONS:
+            return False
+
+        if not self.same_site:
+            return True
+
+        site = site_of(url)
+        return any(site == s or site.endswith("." + s) for s in sites)
+
+    def _mark_seen(self, url):
+        if url in self.seen:
+            return False
+        self.seen.add(url)
+        return True
+
+    def _robots_allowed(self, urls):
+        for url in urls:
+            if self.robots and not self.robots.allowed(url):
+                self.stats["robots_blocked"] += 1
+                continue
+            yield url
+
+    # --------------------------------------------------
+    # Crawl
+    # --------------------------------------------------
+    def crawl(self, seeds):
+        frontier = []
+        for seed in seeds:
+            url = canonicalize_url(seed)
+            if self._mark_seen(url):
+                frontier.append(url)
+
+        sites = {site_of(url) for url in frontier}
+        depth = 0
+
+        while frontier and depth <= self.max_depth:
+            remaining = self.max_pages - self.stats["pages"]
+            if remaining <= 0:
+                break
+
+            batch = islice(self._robots_allowed(frontier), remaining)
+            next_frontier = []
+
+            for url, result in self.parser.scrape_many(
+                batch, concurrency=self.concurrency, per_host=self.per_host
+            ):
+                self.stats["pages"] += 1
+
+                if not result["success"]:
+                    self.stats["failed"] += 1
+
+                elif depth < self.max_depth:
+                    for link in result["links"]:
+                        child = canonicalize_url(link["url"])
+
+                        if not self._in_scope(child, sites):
+                            self.stats["out_of_scope"] += 1
+                            continue
+
+                        if self._mark_seen(child):
+                            next_frontier.append(child)
+
+                yield url, result
+
+            frontier = next_frontier
+            depth += 1
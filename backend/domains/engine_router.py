@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class EngineRouter:
+    """
+    Learned routing between the static (requests) and Selenium engines.
+
+    Remembers, per host (and optionally per first path segment), which
+    engine last produced usable content so later pages skip straight to
+    it. Entries expire after `ttl` seconds and are persisted as JSON at
+    `path` when one is given, after every `autosave_every` changes (by
+    default on every change; the file is tiny).
+    """
+
+    ENGINES = ("requests", "selenium")
+
+    def __init__(self, path=None, ttl=7 * 24 * 3600, use_path_pattern=False,
+                 autosave_every=1):
+        self.path = path
+        self.ttl = ttl
+        self.use_path_pattern = use_path_pattern
+        self.autosave_every = autosave_every
+
+        self.routes = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+        self._dirty = 0
+        self._lock = threading.Lock()
+
+        self.load()
+
+    # --------------------------------------------------
+    # Keys
+    # --------------------------------------------------
+    def _keys(self, url):
+        parsed = urlparse(url)
+        host = parsed.netloc.lower()
+
+        if not self.use_path_pattern:
+            return [host]
+
+        segment = parsed.path.strip("/").split("/", 1)[0]
+        if not segment:
+            return [host]
+
+        return [f"{host}/{segment}", host]
+
+    # --------------------------------------------------
+    # Lookup / record
+    # --------------------------------------------------
+    def lookup(self, url):
+        now = time.time()
+
+        with self._lock:
+            for key in self._keys(url):
+                entry = self.routes.get(key)
+                if not entry:
+                    continue
+
+                if now - entry["updated"] > self.ttl:
+                    del self.routes[key]
+                    self._dirty += 1
+                    continue
+
+                self.stats["hits"] += 1
+                return entry["method"]
+
+            self.stats["misses"] += 1
+            return None
+
+    def record(self, url, method):
+        if method not in self.ENGINES:
+            return
+
+        entry = {"method": method, "updated": time.time()}
+
+        with self._lock:
+            for key in self._keys(url):
+                self.routes[key] = dict(entry)
+            should_save = self._mark_dirty()
+
+        if should_save:
+            self.save()
+
+    def forget(self, url):
+        with self._lock:
+            for key in self._keys(url):
+                self.routes.pop(key, None)
+            should_save = self._mark_dirty()
+
+        if should_save:
+            self.save()
+
+    def _mark_dirty(self):
+        # Caller holds the lock
+        self._dirty += 1
+        return bool(self.path) and self._dirty >= self.autosave_every
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    # --------------------------------------------------
+    # Persistence
+    # --------------------------------------------------
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        self.routes = {
+            key: entry for key, entry in data.items()
+            if entry.get("method") in self.ENGINES
+            and now - entry.get("updated", 0) <= self.ttl
+        }
+
+    def save(self):
+        if not self.path:
+            return
+
+        with self._lock:
+            snapshot = dict(self.routes)
+            self._dirty = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Per-thread temp file so concurrent saves can't interleave writes
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
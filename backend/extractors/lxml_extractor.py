@@ -0,0 +1,150 @@
+from urllib.parse import urljoin
+
+from lxml import etree
+from lxml.html import HTMLParser
+
+
+# Subtrees dropped entirely (mirrors WebParser._clean_soup)
+REMOVED_TAGS = {"script", "style", "nav", "footer", "aside", "noscript"}
+
+# BeautifulSoup types strings under these as Template/Ruby strings, which
+# get_text() leaves out; skip them too so both engines agree.
+HIDDEN_TEXT_TAGS = {"template", "rt", "rp"}
+
+
+def parse_html(html):
+    """
+    Parse markup (str or bytes) into an lxml root element, or None when
+    the document is empty.
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+        parser = HTMLParser(encoding="utf-8")
+    else:
+        parser = HTMLParser()
+
+    if not html.strip():
+        return None
+
+    return etree.fromstring(html, parser)
+
+
+# Python codec names (as returned by codecs.lookup) that libxml2 spells
+# differently; otherwise underscores become hyphens (euc_jp -> euc-jp)
+LIBXML2_ENCODINGS = {
+    "utf-8-sig": "utf-8",
+    "mac-roman": "macintosh"
+}
+
+
+def libxml2_encoding(encoding):
+    return LIBXML2_ENCODINGS.get(encoding, encoding.replace("_", "-"))
+
+
+def feed_parser(encoding):
+    """
+    lxml parser for incremental use: feed() byte chunks as they arrive,
+    then close() returns the root element. Encodings libxml2 doesn't
+    know fall back to its own detection.
+    """
+    try:
+        return HTMLParser(encoding=libxml2_encoding(encoding))
+    except LookupError:
+        return HTMLParser()
+
+
+def extract_page(html, base_url):
+    """
+    Extract title, description, cleaned text and links in a single
+    traversal of an lxml tree.
+
+    Produces the same values as WebParser's BeautifulSoup path.
+    """
+    root = html if isinstance(html, etree._Element) else parse_html(html)
+
+    title = None
+    description = None
+    strings = []
+    anchors = []
+
+    open_anchors = []
+    hidden = 0
+
+    def emit(text):
+        if not text or hidden:
+            return
+
+        text = text.strip()
+        if not text:
+            return
+
+        strings.append(text)
+        for anchor in open_anchors:
+            anchor["parts"].append(text)
+
+    stack = [root] if root is not None else []
+
+    while stack:
+        item = stack.pop()
+
+        # Closing marker: leave the element, then emit its tail
+        if isinstance(item, tuple):
+            el = item[1]
+            tag = el.tag
+
+            if tag == "a" and open_anchors and open_anchors[-1]["el"] is el:
+                open_anchors.pop()
+            if tag in HIDDEN_TEXT_TAGS:
+                hidden -= 1
+
+            emit(el.tail)
+            continue
+
+        el = item
+        tag = el.tag
+
+        # Comments, processing instructions and removed subtrees keep
+        # only their tail text
+        if not isinstance(tag, str) or tag in REMOVED_TAGS:
+            emit(el.tail)
+            continue
+
+        if tag == "title" and title is None:
+            title = (el.text or "").strip()
+
+        elif tag == "meta" and description is None and el.get("name") == "description":
+            description = (el.get("content") or "").strip()
+
+        elif tag == "a" and el.get("href") is not None:
+            anchor = {"el": el, "href": el.get("href"), "parts": []}
+            anchors.append(anchor)
+            open_anchors.append(anchor)
+
+        if tag in HIDDEN_TEXT_TAGS:
+            hidden += 1
+
+        emit(el.text)
+
+        stack.append(("close", el))
+        stack.extend(reversed(el))
+
+    text = "\n".join(strings)
+    content = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+    links = []
+    for anchor in anchors:
+        href = urljoin(base_url, anchor["href"])
+        text = "".join(anchor["parts"])
+
+        if href.startswith("http") and text:
+            links.append({
+                "text": text,
+                "url": href
+            })
+
+    return {
+        "title": title if title is not None else "No title",
+        "description": description if description is not None else "No description",
+        "content": content,
+        "links": links
+    }
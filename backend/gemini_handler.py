@@ -1,17 +1,76 @@
-import google.generativeai as genai
+import time
+from collections import deque
+
+from backend.llm.history import ChatHistory
+from backend.llm.map_reduce import MapReduceSummarizer
+from backend.llm.providers import GeminiProvider, contents_text, estimate_tokens
 
 
 class GeminiHandler:
-    """Handle Gemini AI interactions"""
+    """Handle Gemini AI interactions
+    
+    With a `rag_engine`, questions and insight tasks are answered from
+    the top-k retrieved chunks that fit in `context_token_budget` tokens
+    instead of the whole page; the chunks used are returned alongside
+    the response.
+    When nothing is retrieved, the leading part of the page that fits
+    the budget is used instead (marked 'fallback': True).
+    
+    With a `response_cache` (LLMResponseCache), single-turn generations
+    (summaries, insights, single_turn questions) are reused while the
+    prompt content is unchanged; pass force_refresh=True to regenerate.
+    
+    stream_question / stream_summary / stream_insights yield text as the
+    model produces it; the dict-returning methods wrap them. Timings
+    (ttft_ms, total_ms) of the latest call are in `last_call`.
+    
+    Content larger than `summary_token_budget` tokens is summarized
+    map-reduce style: sections are summarized concurrently on
+    `summary_workers` threads and merged until they fit one prompt.
+    
+    Model calls go through an LLMProvider (GeminiProvider by default),
+    which rate-limits and retries them; pass `provider` to use another
+    backend, e.g. FakeProvider for offline runs.
     
-    def __init__(self, api_key):
-        genai.configure(api_key=api_key)
+    Chat turns are kept in a ChatHistory: the page context is pinned once
+    and, with `history_token_budget` set, older turns are folded into a
+    rolling summary so follow-up prompts stop growing. Each question's
+    prompt size is recorded in `prompt_sizes`.
+    
+    Every model call and cache hit is recorded in the provider's metrics
+    registry under its template id ('chat' for chat turns); the record of
+    the latest call is returned as `usage`.
+    """
+    
+    MODEL_NAME = 'gemini-2.5-flash'
+    
+    def __init__(self, api_key, rag_engine=None, context_token_budget=3000, top_k=8,
+                 response_cache=None, summary_token_budget=12000, summary_workers=4,
+                 provider=None, history_token_budget=None, history_keep_turns=2):
         # FIX: Changed from 'gemini-1.5-flash' to the latest stable model alias.
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
-        self.chat = None
+        self.provider = provider or GeminiProvider(api_key, model_name=self.MODEL_NAME)
+        self.model_name = self.provider.model_name
+        self.response_cache = response_cache
+        self.history = ChatHistory(
+            token_budget=history_token_budget,
+            keep_turns=history_keep_turns,
+            summarize=lambda prompt: self._generate('history_summary', prompt)[0]
+        )
+        self.prompt_sizes = []
         self.context = ""
+        self.rag_engine = rag_engine
+        self.context_token_budget = context_token_budget
+        self.top_k = top_k
+        self.scope_url = None
+        self.last_call = {}
+        self.call_timings = deque(maxlen=200)
+        self.summarizer = MapReduceSummarizer(
+            self._generate,
+            token_budget=summary_token_budget,
+            max_workers=summary_workers
+        )
     
-    def set_context(self, content, title="", description=""):
+    def set_context(self, content, title="", description="", url=None):
         """Set the scraped content as context"""
         self.context = f"""
 Title: {title}
@@ -20,8 +79,26 @@ Description: {description}
 Content:
 {content}
 """
+        self.scope_url = url
+        
+        if self.rag_engine:
+            # Retrieval mode: only page metadata goes into the history,
+            # relevant excerpts are attached to each question
+            self.history.pin([
+                {
+                    "role": "user",
+                    "parts": [f"I've scraped a website titled \"{title}\" ({description}). With each question I'll include the most relevant excerpts from it. Please answer only from those excerpts."]
+                },
+                {
+                    "role": "model",
+                    "parts": ["Understood. I'll answer from the excerpts you provide with each question."]
+                }
+            ])
+            self.prompt_sizes = []
+            return
+        
         # Start a new chat session with context
-        self.chat = self.model.start_chat(history=[
+        self.history.pin([
             {
                 "role": "user",
                 "parts": [f"I've scraped the following content from a website. Please help me answer questions about it:\n\n{self.context}"]
@@ -31,39 +108,225 @@ Content:
                 "parts": ["I've received the scraped content. I'm ready to answer your questions about it. What would you like to know?"]
             }
         ])
+        self.prompt_sizes = []
+    
+    def retrieve_context(self, query):
+        """Top-k chunks for a query that fit within the token budget"""
+        results = self.rag_engine.retrieve(query, top_k=self.top_k, url=self.scope_url)
+        
+        selected = []
+        used = 0
+        for chunk in results:
+            cost = estimate_tokens(chunk['text'])
+            if selected and used + cost > self.context_token_budget:
+                break
+            selected.append(chunk)
+            used += cost
+        
+        if not selected and self.context:
+            # Nothing matched (common for task-style inputs with BM25):
+            # ground on the start of the page rather than an empty block
+            selected.append(self._context_slice())
+        
+        return selected
+    
+    def _context_slice(self):
+        """Leading part of the page context that fits the token budget"""
+        limit = self.context_token_budget * 4
+        text = self.context.strip()
+        if len(text) > limit:
+            cut = text.rfind("\n", 0, limit)
+            text = text[:cut if cut > limit // 2 else limit]
+        
+        return {
+            'score': 0.0,
+            'text': text,
+            'links': [],
+            'url': self.scope_url or '',
+            'title': '',
+            'fallback': True
+        }
+    
+    def _excerpt_prompt(self, chunks, instruction):
+        excerpts = "\n\n".join(
+            f"[{i}] {chunk['text']}" for i, chunk in enumerate(chunks, start=1)
+        )
+        return f"""Relevant excerpts from the scraped content:
+
+{excerpts}
+
+{instruction}"""
+    
+    @staticmethod
+    def _grounding(chunks):
+        sources = {}
+        for chunk in chunks:
+            for link in chunk['links']:
+                sources[link['url']] = link
+        
+        return {
+            'chunks': chunks,
+            'sources': list(sources.values())
+        }
+    
+    # ------------------------------------------------------------------
+    # Streaming core
+    # ------------------------------------------------------------------
+    def _timed(self, call, texts):
+        """Yield text pieces, recording time-to-first-token and total time"""
+        start = time.perf_counter()
+        first = None
+        
+        for text in texts:
+            if not text:
+                continue
+            if first is None:
+                first = time.perf_counter()
+            yield text
+        
+        end = time.perf_counter()
+        if 'usage' not in self.last_call:
+            self.last_call['usage'] = self.provider.last_record()
+        self.last_call.update({
+            'call': call,
+            'ttft_ms': round(((first or end) - start) * 1000, 1),
+            'total_ms': round((end - start) * 1000, 1)
+        })
+        self.call_timings.append(dict(self.last_call))
+    
+    def _cache_lookup(self, template_id, prompt, force_refresh):
+        """Cached response (or None) and the metrics record of a hit"""
+        if not self.response_cache:
+            return None, None
+        
+        start = time.perf_counter()
+        cached = self.response_cache.get(self.model_name, template_id, prompt, force_refresh=force_refresh)
+        if cached is None or self.provider.metrics is None:
+            return cached, None
+        
+        # Hits spend no quota, so they are recorded without tokens
+        record = self.provider.metrics.record(
+            template_id,
+            self.model_name,
+            wall_ms=(time.perf_counter() - start) * 1000,
+            cached=True,
+            estimated=False
+        )
+        return cached, record
+    
+    def _stream_generate(self, call, template_id, prompt, force_refresh=False):
+        """Single-turn streamed generation through the response cache"""
+        cache = self.response_cache
+        
+        cached, record = self._cache_lookup(template_id, prompt, force_refresh)
+        if cached is not None:
+            self.last_call.update({'cached': True, 'usage': record})
+            yield from self._timed(call, [cached])
+            return
+        
+        self.last_call['cached'] = False
+        
+        parts = []
+        for text in self._timed(call, self.provider.stream(prompt, feature=template_id)):
+            parts.append(text)
+            yield text
+        
+        if cache:
+            cache.set(self.model_name, template_id, prompt, "".join(parts))
+    
+    def _generate(self, template_id, prompt, force_refresh=False):
+        """Blocking single-turn generation, safe to call from worker threads"""
+        cache = self.response_cache
+        
+        cached, _ = self._cache_lookup(template_id, prompt, force_refresh)
+        if cached is not None:
+            return cached, True
+        
+        text = self.provider.generate(prompt, feature=template_id)
+        
+        if cache:
+            cache.set(self.model_name, template_id, prompt, text)
+        
+        return text, False
     
-    def ask_question(self, question):
-        """Ask a question about the scraped content"""
+    def _stream_chat(self, call, message, question=None):
+        """Stream a chat turn; `question` (default `message`) is what the
+        transcript keeps, so per-turn excerpts aren't carried forward"""
+        contents = self.history.messages(message)
+        size = {
+            'turn': len(self.prompt_sizes) + 1,
+            'prompt_tokens': estimate_tokens(contents_text(contents)),
+            'history_tokens': self.history.tokens()
+        }
+        self.prompt_sizes.append(size)
+        self.last_call['prompt_size'] = size
+        
+        parts = []
+        for text in self._timed(call, self.provider.stream(contents, feature='chat')):
+            parts.append(text)
+            yield text
+        
+        self.history.append(question or message, "".join(parts))
+    
+    def _wrap(self, stream):
+        """Collect a stream into the classic response dict"""
         try:
-            if not self.chat:
-                return {
-                    'success': False,
-                    'error': 'No content loaded. Please scrape a website first.'
-                }
-            
-            response = self.chat.send_message(question)
+            text = "".join(stream)
             
-            return {
+            result = {
                 'success': True,
-                'response': response.text
+                'response': text
             }
+            for key in ('cached', 'chunks', 'sources', 'map_reduce', 'prompt_size', 'usage'):
+                if key in self.last_call:
+                    result[key] = self.last_call[key]
+            
+            return result
         
         except Exception as e:
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'error_type': type(e).__name__
             }
     
-    def summarize(self):
-        """Generate a summary of the scraped content"""
-        try:
-            if not self.context:
-                return {
-                    'success': False,
-                    'error': 'No content to summarize'
-                }
-            
-            prompt = f"""Please provide a comprehensive summary of the following content. 
+    # ------------------------------------------------------------------
+    # Streaming API
+    # ------------------------------------------------------------------
+    def stream_question(self, question, single_turn=False, template_id='question', force_refresh=False):
+        """Stream the answer to a question as text chunks"""
+        self.last_call = {}
+        
+        if single_turn:
+            yield from self._stream_generate('question', template_id, question, force_refresh)
+            return
+        
+        if not self.history:
+            raise ValueError('No content loaded. Please scrape a website first.')
+        
+        if self.rag_engine:
+            chunks = self.retrieve_context(question)
+            self.last_call.update(self._grounding(chunks))
+            message = self._excerpt_prompt(chunks, f"Question: {question}")
+            yield from self._stream_chat('question', message, question)
+            return
+        
+        yield from self._stream_chat('question', question)
+    
+    def stream_summary(self, force_refresh=False):
+        """Stream a summary of the scraped content as text chunks"""
+        self.last_call = {}
+        
+        if not self.context:
+            raise ValueError('No content to summarize')
+        
+        if not self.summarizer.fits(self.context):
+            prompt, stats = self.summarizer.reduce_prompt(self.context, force_refresh)
+            self.last_call['map_reduce'] = stats
+            yield from self._stream_generate('summary', 'summary_final', prompt, force_refresh)
+            return
+        
+        prompt = f"""Please provide a comprehensive summary of the following content. 
 Include:
 1. Main topic or purpose
 2. Key points (3-5 bullet points)
@@ -71,48 +334,51 @@ Include:
 
 Content:
 {self.context}"""
-            
-            response = self.model.generate_content(prompt)
-            
-            return {
-                'success': True,
-                'response': response.text
-            }
         
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+        yield from self._stream_generate('summary', 'summary', prompt, force_refresh)
     
-    def extract_insights(self, task):
-        """Perform specific tasks on the content"""
-        try:
-            if not self.context:
-                return {
-                    'success': False,
-                    'error': 'No content available'
-                }
-            
+    def stream_insights(self, task, force_refresh=False):
+        """Stream the result of a task on the content as text chunks"""
+        self.last_call = {}
+        
+        if not self.context:
+            raise ValueError('No content available')
+        
+        if self.rag_engine:
+            chunks = self.retrieve_context(task)
+            self.last_call.update(self._grounding(chunks))
+            prompt = self._excerpt_prompt(
+                chunks, f"Based on these excerpts, please {task}"
+            )
+        else:
             prompt = f"""Based on the following scraped content, please {task}
 
 Content:
 {self.context}"""
-            
-            response = self.model.generate_content(prompt)
-            
-            return {
-                'success': True,
-                'response': response.text
-            }
         
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+        yield from self._stream_generate('insights', 'insights', prompt, force_refresh)
+    
+    # ------------------------------------------------------------------
+    # Blocking API
+    # ------------------------------------------------------------------
+    def ask_question(self, question, single_turn=False, template_id='question', force_refresh=False):
+        """Ask a question about the scraped content
+        
+        single_turn=True sends `question` as a standalone prompt (no chat
+        history), which makes it cacheable under `template_id`.
+        """
+        return self._wrap(self.stream_question(question, single_turn, template_id, force_refresh))
+    
+    def summarize(self, force_refresh=False):
+        """Generate a summary of the scraped content"""
+        return self._wrap(self.stream_summary(force_refresh))
+    
+    def extract_insights(self, task, force_refresh=False):
+        """Perform specific tasks on the content"""
+        return self._wrap(self.stream_insights(task, force_refresh))
     
     def clear_context(self):
         """Clear the current context and chat history"""
         self.context = ""
-        self.chat = None
+        self.history.clear()
+        self.prompt_sizes = []
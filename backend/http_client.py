@@ -0,0 +1,103 @@
+import codecs
+import re
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0 Safari/537.36"
+    )
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_connections=10, pool_maxsize=10, retries=2,
+                   backoff_factor=0.3, headers=None):
+    """
+    Build a keep-alive requests.Session backed by a connection pool.
+
+    pool_connections : number of distinct hosts kept in the pool
+    pool_maxsize     : open connections kept per host
+    retries          : retries on connection errors and 429/5xx responses
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+        respect_retry_after_header=True
+    )
+
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers or DEFAULT_HEADERS)
+
+    return session
+
+
+HTML_CONTENT_TYPES = {
+    "text/html", "application/xhtml+xml", "application/xml", "text/xml", "text/plain"
+}
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.I)
+
+
+def _valid_charset(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def charset_from_content_type(content_type):
+    """Charset parameter of a Content-Type header, or None."""
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset":
+            return _valid_charset(value.strip().strip("\"'"))
+    return None
+
+
+def sniff_meta_charset(head):
+    """
+    Charset declared in the first bytes of an HTML document (BOM or
+    <meta charset> / http-equiv), or None.
+    """
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    match = _META_CHARSET.search(head)
+    return _valid_charset(match.group(1).decode("ascii")) if match else None
+
+
+def guess_charset(head):
+    """
+    Charset for an unlabelled document: UTF-8 when the first bytes are
+    valid UTF-8, otherwise Windows-1252 (a superset of Latin-1, which
+    requests assumes for unlabelled text/*).
+    """
+    try:
+        # Not final: a multi-byte character may straddle the cut
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
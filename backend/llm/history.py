@@ -0,0 +1,123 @@
+from typing import Callable, Dict, List, Optional
+
+from backend.llm.providers import contents_text, estimate_tokens
+
+
+SUMMARY_PROMPT = """You are maintaining a running summary of a conversation about a web
+page. Update the summary with the new exchanges below. Keep facts the user
+asked about, answers given and any open follow-ups; stay under 200 words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}"""
+
+
+def _message(role, text):
+    return {"role": role, "parts": [text]}
+
+
+class ChatHistory:
+    """
+    Chat transcript with a token budget.
+
+    The page context is pinned once at the head of every prompt and is
+    never compacted. Completed turns follow; when the turns plus the
+    rolling summary exceed `token_budget` tokens, all but the latest
+    `keep_turns` turns are folded into the summary through
+    `summarize(prompt) -> str`. Without a summarizer (or with
+    token_budget=None) the oldest turns are dropped or kept, respectively.
+    If the summarizer fails, the turns are kept and folding is retried
+    after the next turn.
+    """
+
+    def __init__(self, token_budget: Optional[int] = 2000, keep_turns: int = 2,
+                 summarize: Callable[[str], str] = None):
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.summarize = summarize
+        self.pinned: List[Dict] = []
+        self.summary = ""
+        self.turns: List[tuple] = []
+        self.compactions = 0
+        self.compaction_failures = 0
+
+    def __bool__(self):
+        return bool(self.pinned)
+
+    def pin(self, messages: List[Dict]):
+        """Replace the pinned context and start a fresh conversation"""
+        self.pinned = list(messages)
+        self.clear_turns()
+
+    def clear_turns(self):
+        self.summary = ""
+        self.turns = []
+
+    def clear(self):
+        self.pinned = []
+        self.clear_turns()
+
+    # =========================
+    # Prompt assembly
+    # =========================
+    def messages(self, message: str = None) -> List[Dict]:
+        contents = list(self.pinned)
+
+        if self.summary:
+            contents += [
+                _message("user", f"Summary of our conversation so far:\n{self.summary}"),
+                _message("model", "Noted, I'll keep that in mind.")
+            ]
+
+        for question, answer in self.turns:
+            contents += [_message("user", question), _message("model", answer)]
+
+        if message is not None:
+            contents.append(_message("user", message))
+
+        return contents
+
+    def tokens(self) -> int:
+        """Tokens of the compactable part (summary and turns)"""
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(question) + estimate_tokens(answer)
+            for question, answer in self.turns
+        )
+
+    def prompt_tokens(self, message: str = "") -> int:
+        return estimate_tokens(contents_text(self.messages(message)))
+
+    # =========================
+    # Updates
+    # =========================
+    def append(self, question: str, answer: str):
+        self.turns.append((question, answer))
+        self.compact()
+
+    def compact(self):
+        if self.token_budget is None or self.tokens() <= self.token_budget:
+            return
+        if len(self.turns) <= self.keep_turns:
+            return
+
+        split = len(self.turns) - self.keep_turns
+        old = self.turns[:split]
+        summary = self.summary
+
+        if self.summarize:
+            turns = "\n\n".join(f"User: {q}\nAssistant: {a}" for q, a in old)
+            try:
+                summary = self.summarize(
+                    SUMMARY_PROMPT.format(summary=self.summary or "(none)", turns=turns)
+                ).strip()
+            except Exception:
+                # Keep the turns; the prompt stays over budget for now
+                self.compaction_failures += 1
+                return
+
+        # Only change state once the summary exists
+        self.turns = self.turns[split:]
+        self.summary = summary
+        self.compactions += 1
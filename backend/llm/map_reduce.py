@@ -0,0 +1,214 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from backend.llm.providers import estimate_tokens
+from backend.rag.chunker import SENTENCE_RE
+
+
+# Sections are cached by prompt, so the map prompt depends only on the
+# section text (no position or section count)
+MAP_PROMPT = """Summarize the following section of a longer web page. Keep the key
+points, names, figures and conclusions; omit navigation and boilerplate.
+
+Section:
+{text}"""
+
+REDUCE_PROMPT = """The following are summaries of consecutive sections of a longer web
+page. Merge them into a single summary that keeps the key points, names,
+figures and conclusions.
+
+{summaries}"""
+
+FINAL_PROMPT = """The following are summaries of consecutive sections of a web page.
+Please provide a comprehensive summary of the whole page.
+Include:
+1. Main topic or purpose
+2. Key points (3-5 bullet points)
+3. Important details or conclusions
+
+{summaries}"""
+
+
+class MapReduceSummarizer:
+    """
+    Summarize content too large for a single prompt.
+
+    Content is split into sections of about `chunk_tokens` tokens, each
+    section is summarized concurrently on a pool of `max_workers` threads
+    (map), and the partial summaries are merged in groups that fit
+    `token_budget` until they fit in one prompt (reduce).
+
+    Section boundaries are content-defined: a section ends after a
+    paragraph (or sentence of an oversized paragraph) whose hash passes
+    a size-weighted test, within a quarter to twice `chunk_tokens`. An
+    edit therefore only moves the boundaries around it, and the sections
+    before and after keep their exact text.
+
+    `generate(template_id, prompt, force_refresh)` performs one model call
+    and returns (text, cached). When it is backed by a response cache,
+    unchanged sections are answered from the cache, so re-summarizing an
+    edited page only pays for the sections that changed.
+    """
+
+    def __init__(self, generate: Callable[[str, str, bool], Tuple[str, bool]],
+                 token_budget: int = 12000, chunk_tokens: int = 2000,
+                 max_workers: int = 4):
+        self.generate = generate
+        self.token_budget = token_budget
+        self.chunk_tokens = chunk_tokens
+        self.min_tokens = chunk_tokens // 4
+        self.max_tokens = chunk_tokens * 2
+        self.max_workers = max_workers
+
+    def fits(self, content: str) -> bool:
+        return estimate_tokens(content) <= self.token_budget
+
+    # =========================
+    # Sectioning
+    # =========================
+    def _units(self, content: str) -> List[str]:
+        """Paragraphs, with oversized ones split at sentences, then words"""
+        units = []
+        for paragraph in content.splitlines():
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if estimate_tokens(paragraph) <= self.max_tokens:
+                units.append(paragraph)
+                continue
+
+            for sentence in SENTENCE_RE.split(paragraph):
+                if estimate_tokens(sentence) <= self.max_tokens:
+                    units.append(sentence)
+                    continue
+
+                words = sentence.split()
+                step = max(1, self.chunk_tokens // 2)
+                units.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+
+        return units
+
+    def _is_cut(self, unit: str, tokens: int) -> bool:
+        """
+        Boundary test that depends only on the unit itself. Each unit
+        passes with probability proportional to its size, so sections
+        grow by about `chunk_tokens - min_tokens` past the minimum.
+        """
+        digest = hashlib.blake2b(unit.encode("utf-8"), digest_size=8).digest()
+        point = int.from_bytes(digest, "big") / 2 ** 64
+        return point < tokens / max(1, self.chunk_tokens - self.min_tokens)
+
+    def sections(self, content: str) -> List[str]:
+        sections = []
+        current: List[str] = []
+        used = 0
+
+        for unit in self._units(content):
+            tokens = estimate_tokens(unit)
+            if current and used + tokens > self.max_tokens:
+                sections.append("\n".join(current))
+                current = []
+                used = 0
+
+            current.append(unit)
+            used += tokens
+
+            if used >= self.min_tokens and self._is_cut(unit, tokens):
+                sections.append("\n".join(current))
+                current = []
+                used = 0
+
+        if current:
+            sections.append("\n".join(current))
+
+        return sections
+
+    # =========================
+    # Map / reduce steps
+    # =========================
+    def _run(self, template_id: str, prompts: List[str], force_refresh: bool,
+             stats: Dict) -> List[str]:
+        if len(prompts) == 1:
+            results = [self.generate(template_id, prompts[0], force_refresh)]
+        else:
+            workers = min(self.max_workers, len(prompts))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(
+                    lambda prompt: self.generate(template_id, prompt, force_refresh),
+                    prompts
+                ))
+
+        stats["calls"] += len(results)
+        stats["cached_calls"] += sum(1 for _, cached in results if cached)
+        return [text for text, _ in results]
+
+    def _groups(self, summaries: List[str]) -> List[List[str]]:
+        """Consecutive groups that fit the budget, at least two per group"""
+        groups = []
+        current: List[str] = []
+        used = 0
+
+        for summary in summaries:
+            cost = estimate_tokens(summary)
+            if len(current) >= 2 and used + cost > self.token_budget:
+                groups.append(current)
+                current = []
+                used = 0
+            current.append(summary)
+            used += cost
+
+        if current:
+            if len(current) == 1 and groups:
+                groups[-1].append(current[0])
+            else:
+                groups.append(current)
+
+        return groups
+
+    @staticmethod
+    def _join(summaries: List[str]) -> str:
+        return "\n\n".join(
+            f"[{i}] {summary.strip()}" for i, summary in enumerate(summaries, start=1)
+        )
+
+    # =========================
+    # Entry point
+    # =========================
+    def reduce_prompt(self, content: str, force_refresh: bool = False) -> Tuple[str, Dict]:
+        """
+        Map and reduce `content` down to the final summary prompt, which
+        the caller sends (or streams) itself. Returns (prompt, stats).
+        """
+        sections = self.sections(content)
+        if not sections:
+            sections = [content]
+
+        stats = {"sections": len(sections), "levels": 0, "calls": 0, "cached_calls": 0}
+
+        summaries = self._run(
+            "summary_map",
+            [MAP_PROMPT.format(text=text) for text in sections],
+            force_refresh,
+            stats
+        )
+
+        while len(summaries) > 1 and not self.fits(self._join(summaries)):
+            stats["levels"] += 1
+            summaries = self._run(
+                "summary_reduce",
+                [REDUCE_PROMPT.format(summaries=self._join(group))
+                 for group in self._groups(summaries)],
+                force_refresh,
+                stats
+            )
+
+        return FINAL_PROMPT.format(summaries=self._join(summaries)), stats
+
+    def summarize(self, content: str, force_refresh: bool = False) -> Tuple[str, Dict]:
+        prompt, stats = self.reduce_prompt(content, force_refresh)
+        text, cached = self.generate("summary_final", prompt, force_refresh)
+
+        stats["calls"] += 1
+        stats["cached_calls"] += int(cached)
+        return text, stats
@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+# USD per 1M tokens (input, output) at list price; models not listed are
+# reported with zero cost. Override with MetricsRegistry(prices=...).
+MODEL_PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.0-flash": (0.10, 0.40)
+}
+
+_COUNTERS = (
+    ("calls", "llm_calls_total", "Model calls, including cache hits"),
+    ("errors", "llm_errors_total", "Model calls that raised"),
+    ("cache_hits", "llm_cache_hits_total", "Calls answered from the response cache"),
+    ("retries", "llm_retries_total", "Retried attempts"),
+    ("prompt_tokens", "llm_prompt_tokens_total", "Prompt tokens sent"),
+    ("response_tokens", "llm_response_tokens_total", "Response tokens received"),
+    ("cost_usd", "llm_cost_usd_total", "Estimated spend in USD")
+)
+
+
+def _empty_totals():
+    totals = {key: 0 for key, _, _ in _COUNTERS}
+    totals["wall_ms"] = 0.0
+    return totals
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    In-process registry of model call records.
+
+    Each record holds the feature (prompt template) and model, prompt and
+    response token counts, wall and time-to-first-token milliseconds,
+    retries, whether the response cache answered it, the outcome and an
+    estimated cost. Totals are kept per (feature, model); the latest
+    `max_records` records are kept for JSON lines export.
+    """
+
+    def __init__(self, max_records=5000, prices=None):
+        self.prices = dict(MODEL_PRICES if prices is None else prices)
+        self.records = deque(maxlen=max_records)
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def cost(self, model, prompt_tokens, response_tokens):
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * input_price + response_tokens * output_price) / 1_000_000
+
+    def record(self, feature, model, prompt_tokens=0, response_tokens=0, wall_ms=0.0,
+               ttft_ms=None, retries=0, cached=False, error=None, estimated=True):
+        record = {
+            "ts": round(time.time(), 3),
+            "feature": feature,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": response_tokens,
+            "wall_ms": round(wall_ms, 1),
+            "ttft_ms": None if ttft_ms is None else round(ttft_ms, 1),
+            "retries": retries,
+            "cached": cached,
+            "error": error,
+            "tokens_estimated": estimated,
+            # Cache hits cost nothing
+            "cost_usd": 0.0 if cached else round(self.cost(model, prompt_tokens, response_tokens), 8)
+        }
+
+        with self._lock:
+            self.records.append(record)
+
+            totals = self.totals.setdefault((feature, model), _empty_totals())
+            totals["calls"] += 1
+            totals["errors"] += int(error is not None)
+            totals["cache_hits"] += int(cached)
+            totals["retries"] += retries
+            totals["prompt_tokens"] += prompt_tokens
+            totals["response_tokens"] += response_tokens
+            totals["cost_usd"] += record["cost_usd"]
+            totals["wall_ms"] += record["wall_ms"]
+
+        return record
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+            self.totals = {}
+
+    # =========================
+    # Reporting
+    # =========================
+    def summary(self):
+        """One row per feature and model, for display"""
+        with self._lock:
+            items = sorted(self.totals.items())
+
+        rows = []
+        for (feature, model), totals in items:
+            row = {"feature": feature, "model": model}
+            row.update({key: totals[key] for key, _, _ in _COUNTERS})
+            row["cost_usd"] = round(row["cost_usd"], 6)
+            row["avg_ms"] = round(totals["wall_ms"] / totals["calls"], 1)
+            rows.append(row)
+
+        return rows
+
+    def to_jsonl(self):
+        with self._lock:
+            records = list(self.records)
+        return "".join(json.dumps(record) + "\n" for record in records)
+
+    def write_jsonl(self, path):
+        """Append buffered records to `path` and return how many were written"""
+        with self._lock:
+            records = list(self.records)
+            self.records.clear()
+
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+        return len(records)
+
+    def to_prometheus(self):
+        """Totals in the Prometheus text exposition format"""
+        with self._lock:
+            items = sorted((key, dict(totals)) for key, totals in self.totals.items())
+
+        lines = []
+        for key, name, help_text in _COUNTERS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (feature, model), totals in items:
+                lines.append(
+                    f'{name}{{feature="{_label(feature)}",model="{_label(model)}"}} {totals[key]}'
+                )
+
+        lines.append("# HELP llm_call_seconds Wall time of model calls")
+        lines.append("# TYPE llm_call_seconds summary")
+        for (feature, model), totals in items:
+            labels = f'feature="{_label(feature)}",model="{_label(model)}"'
+            lines.append(f"llm_call_seconds_sum{{{labels}}} {totals['wall_ms'] / 1000:.6f}")
+            lines.append(f"llm_call_seconds_count{{{labels}}} {totals['calls']}")
+
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide default used by providers and handlers
+REGISTRY = MetricsRegistry()
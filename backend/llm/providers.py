@@ -0,0 +1,274 @@
+import hashlib
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from backend.llm.metrics import REGISTRY
+from backend.llm.rate_limit import RateLimiter, backoff_delay
+
+
+_WORD_RE = re.compile(r"\S+")
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def contents_text(contents):
+    """Flatten a prompt string or a list of {role, parts} messages"""
+    if isinstance(contents, str):
+        return contents
+    return "\n".join(
+        part for message in contents for part in message["parts"]
+    )
+
+
+class TransientProviderError(RuntimeError):
+    """A failure worth retrying (rate limited, overloaded, timed out)"""
+
+
+# Shared across providers that aren't given their own limiter, so
+# concurrent handlers (one per scraped page) respect a single cap
+SHARED_LIMITER = RateLimiter(max_concurrency=4)
+
+
+class LLMProvider:
+    """
+    Base class for model backends.
+
+    Subclasses implement _generate(contents) -> str and
+    _stream(contents) -> iterator of str, where contents is a prompt
+    string or a list of {"role": "user" | "model", "parts": [str]}
+    messages. The public generate()/stream() wrap them with the
+    limiter (requests/min, tokens/min, concurrency) and retry transient
+    failures with jittered exponential backoff. A stream is only retried
+    before its first chunk has been yielded.
+
+    Every call is recorded in `metrics` (a MetricsRegistry) under the
+    caller's `feature` name. Subclasses that know the real token usage
+    report it with _report_usage(); otherwise counts are estimated.
+    """
+
+    name = "base"
+    retryable = (TransientProviderError,)
+
+    def __init__(self, model_name, limiter=None, max_retries=4,
+                 backoff_base=0.5, backoff_cap=30.0, metrics=REGISTRY):
+        self.model_name = model_name
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.metrics = metrics
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _generate(self, contents):
+        raise NotImplementedError
+
+    def _stream(self, contents):
+        raise NotImplementedError
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def is_retryable(self, exc):
+        return isinstance(exc, self.retryable)
+
+    def _slot(self, contents):
+        if not self.limiter:
+            return nullcontext()
+        return self.limiter.slot(estimate_tokens(contents_text(contents)))
+
+    def _charge(self, text):
+        if self.limiter:
+            self.limiter.charge(estimate_tokens(text))
+
+    def _report_usage(self, prompt_tokens, response_tokens):
+        self._local.usage = (prompt_tokens, response_tokens)
+
+    def _record(self, feature, contents, text, started, first, retries, error=None):
+        usage = getattr(self._local, "usage", None)
+        self._local.usage = None
+
+        if usage:
+            prompt_tokens, response_tokens = usage
+        else:
+            prompt_tokens = estimate_tokens(contents_text(contents))
+            response_tokens = estimate_tokens(text) if text else 0
+
+        now = time.perf_counter()
+        record = None
+        if self.metrics is not None:
+            record = self.metrics.record(
+                feature,
+                self.model_name,
+                prompt_tokens=prompt_tokens,
+                response_tokens=response_tokens,
+                wall_ms=(now - started) * 1000,
+                ttft_ms=None if first is None else (first - started) * 1000,
+                retries=retries,
+                error=None if error is None else type(error).__name__,
+                estimated=usage is None
+            )
+        self._local.last_record = record
+
+    def last_record(self):
+        """Metrics record of the latest call made on this thread"""
+        return getattr(self._local, "last_record", None)
+
+    def _retry_or_raise(self, exc, attempt):
+        if attempt >= self.max_retries or not self.is_retryable(exc):
+            self._count("failures")
+            raise exc
+
+        self._count("retries")
+        time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+
+    # =========================
+    # Public API
+    # =========================
+    def generate(self, contents, feature="generate"):
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            self._count("requests")
+            try:
+                with self._slot(contents):
+                    text = self._generate(contents)
+                self._charge(text)
+                self._record(feature, contents, text, started, None, attempt)
+                return text
+            except Exception as e:
+                try:
+                    self._retry_or_raise(e, attempt)
+                except Exception:
+                    self._record(feature, contents, "", started, None, attempt, e)
+                    raise
+                attempt += 1
+
+    def stream(self, contents, feature="stream"):
+        started = time.perf_counter()
+        first = None
+        attempt = 0
+        while True:
+            self._count("requests")
+            emitted = []
+            try:
+                with self._slot(contents):
+                    for text in self._stream(contents):
+                        if first is None:
+                            first = time.perf_counter()
+                        emitted.append(text)
+                        yield text
+                text = "".join(emitted)
+                self._charge(text)
+                self._record(feature, contents, text, started, first, attempt)
+                return
+            except Exception as e:
+                try:
+                    if emitted:
+                        self._count("failures")
+                        raise
+                    self._retry_or_raise(e, attempt)
+                except Exception:
+                    self._record(feature, contents, "".join(emitted), started, first, attempt, e)
+                    raise
+                attempt += 1
+
+
+class GeminiProvider(LLMProvider):
+    """google.generativeai backend; shares SHARED_LIMITER by default"""
+
+    name = "gemini"
+    retryable = (
+        TransientProviderError,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.TooManyRequests,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        ConnectionError
+    )
+
+    def __init__(self, api_key, model_name="gemini-2.5-flash", limiter=None, **kwargs):
+        super().__init__(model_name, limiter=limiter or SHARED_LIMITER, **kwargs)
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    def _usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage and usage.prompt_token_count:
+            self._report_usage(usage.prompt_token_count, usage.candidates_token_count or 0)
+
+    def _generate(self, contents):
+        response = self.model.generate_content(contents)
+        self._usage(response)
+        return response.text
+
+    def _stream(self, contents):
+        chunk = None
+        for chunk in self.model.generate_content(contents, stream=True):
+            yield chunk.text
+        # The final chunk carries usage for the whole response
+        if chunk is not None:
+            self._usage(chunk)
+
+
+class FakeProvider(LLMProvider):
+    """
+    Deterministic offline backend for tests and throughput benchmarks.
+
+    The reply is derived from a hash of the prompt, so the same prompt
+    always gets the same answer. `latency` seconds pass before the first
+    chunk and `chunk_latency` between chunks; every `fail_every`-th call
+    raises TransientProviderError to exercise the retry path.
+    """
+
+    name = "fake"
+
+    def __init__(self, model_name="fake-model", latency=0.0, chunk_latency=0.0,
+                 reply_words=40, fail_every=0, limiter=None, **kwargs):
+        super().__init__(model_name, limiter=limiter, **kwargs)
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.reply_words = reply_words
+        self.fail_every = fail_every
+        self.calls = 0
+
+    def reply(self, contents):
+        text = contents_text(contents)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        words = _WORD_RE.findall(text)[-self.reply_words:]
+        return f"[{self.model_name} {digest}] " + " ".join(words)
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+
+        if self.fail_every and calls % self.fail_every == 0:
+            raise TransientProviderError(f"fake failure on call {calls}")
+
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _generate(self, contents):
+        self._call()
+        return self.reply(contents)
+
+    def _stream(self, contents):
+        self._call()
+
+        words = self.reply(contents).split(" ")
+        for i in range(0, len(words), 4):
+            if i and self.chunk_latency:
+                time.sleep(self.chunk_latency)
+            yield " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_min`.
+
+    acquire() blocks until the requested amount is available; charge()
+    debits usage known only after the fact (e.g. response tokens) and may
+    drive the balance negative, which delays later callers.
+    """
+
+    def __init__(self, rate_per_min, capacity=None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity or rate_per_min
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        # A request larger than the bucket could never be satisfied
+        amount = min(amount, self.capacity)
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+    def charge(self, amount):
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    Client-side limits for a model API: requests per minute, tokens per
+    minute and a cap on concurrent in-flight calls. Any limit set to None
+    is not enforced.
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_concurrency=4):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+
+    @contextmanager
+    def slot(self, tokens=0):
+        """Hold a concurrency slot after paying for one request and `tokens`"""
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
+
+        if self._slots:
+            self._slots.acquire()
+        try:
+            yield
+        finally:
+            if self._slots:
+                self._slots.release()
+
+    def charge(self, tokens):
+        if self.tokens and tokens:
+            self.tokens.charge(tokens)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Exponential backoff with full jitter for a zero-based retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
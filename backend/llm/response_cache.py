@@ -0,0 +1,49 @@
+import hashlib
+import threading
+
+from backend.cache.disk_cache import DiskCache
+
+
+class LLMResponseCache:
+    """
+    Disk-backed cache of model responses.
+
+    Entries are keyed by model name, a prompt template id and a hash of
+    the content the prompt was built from, so the same request against
+    unchanged content is answered without calling the model. Backed by
+    DiskCache for TTL and size-bounded LRU eviction.
+    """
+
+    def __init__(self, path, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.store = DiskCache(path, max_bytes=max_bytes, ttl=ttl)
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name, template_id, content):
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        return f"{model_name}:{template_id}:{digest}"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, model_name, template_id, content, force_refresh=False):
+        if force_refresh:
+            self._count("refreshes")
+            return None
+
+        value = self.store.get(self.make_key(model_name, template_id, content))
+        if value is None:
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return value.decode("utf-8")
+
+    def set(self, model_name, template_id, content, text):
+        self.store.set(self.make_key(model_name, template_id, content), text.encode("utf-8"))
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
@@ -1,10 +1,17 @@
-import requests
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from urllib.parse import urljoin
+import threading
+import time
+from urllib.parse import urljoin, urlparse
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from backend.http_client import (
+    create_session, DEFAULT_HEADERS, HTML_CONTENT_TYPES,
+    charset_from_content_type, sniff_meta_charset, guess_charset
+)
+from backend.browser.driver_pool import ChromeDriverPool
+from backend.browser.render import page_stats
+from backend.domains.engine_router import EngineRouter
+from backend.extractors.lxml_extractor import extract_page, feed_parser
 
 
 class WebParser:
@@ -16,17 +23,99 @@ class WebParser:
     - Dynamic scraping (Selenium headless browser)
     - Text extraction
     - Hyperlink extraction for RAG grounding
+
+    Static requests go through one keep-alive session, so repeated
+    scrapes of the same hosts reuse pooled connections. Pass an existing
+    `session` to share a pool, and call `close()` (or use the parser as
+    a context manager) when done.
+
+    Selenium scrapes borrow warm browsers from a ChromeDriverPool that is
+    started on first use; pass `driver_pool` to share one between parsers.
+    A `render` RenderConfig enables fast-render mode (resource blocking,
+    eager page loads, readiness waits). Selenium results report
+    `render_ms` and `bytes` transferred.
+
+    An EngineRouter remembers which engine worked for each host, so later
+    pages from a JS-heavy site go straight to Selenium. Pass `router` to
+    configure persistence, or `router=False` to always try requests first.
+
+    `engine` selects the extraction backend: "bs4" (BeautifulSoup, the
+    default) or "lxml" (single-pass lxml walk, same result shape).
+
+    With an `http_cache` (HTTPCache), static scrapes revalidate stored
+    pages with conditional GETs and reuse them on 304 Not Modified.
     """
 
-    def __init__(self):
-        self.headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0 Safari/537.36"
-            )
+    ENGINES = ("bs4", "lxml")
+
+    def __init__(self, session=None, pool_connections=10, pool_maxsize=10,
+                 retries=2, timeout=15, driver_pool=None, browser_pool_size=2,
+                 max_pages_per_driver=50, max_driver_memory_mb=1024,
+                 router=None, engine="bs4", http_cache=None,
+                 max_bytes=5 * 1024 * 1024, render=None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown extraction engine: {engine}")
+
+        self.engine = engine
+        self.http_cache = http_cache
+        self.max_bytes = max_bytes
+        self.headers = dict(DEFAULT_HEADERS)
+        self.timeout = timeout
+
+        if router is None:
+            router = EngineRouter()
+        self.router = router or None
+
+        self._owns_driver_pool = driver_pool is None
+        self._driver_pool = driver_pool
+        self._driver_pool_lock = threading.Lock()
+        self.render = render
+        self._driver_pool_config = {
+            "size": browser_pool_size,
+            "max_pages": max_pages_per_driver,
+            "max_memory_mb": max_driver_memory_mb
         }
 
+        if render is not None:
+            self._driver_pool_config["options_factory"] = render.chrome_options
+            self._driver_pool_config["on_start"] = render.prepare_driver
+
+        self._owns_session = session is None
+        self.session = session or create_session(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            retries=retries,
+            headers=self.headers
+        )
+
+    # --------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------
+    @property
+    def driver_pool(self):
+        with self._driver_pool_lock:
+            if self._driver_pool is None:
+                self._driver_pool = ChromeDriverPool(**self._driver_pool_config)
+            return self._driver_pool
+
+    def close(self):
+        if self._owns_session and self.session is not None:
+            self.session.close()
+        self.session = None
+
+        if self._owns_driver_pool and self._driver_pool is not None:
+            self._driver_pool.close()
+            self._driver_pool = None
+
+        if self.router:
+            self.router.save()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
     # --------------------------------------------------
     # Cleaning utilities
     # --------------------------------------------------
@@ -54,32 +143,152 @@ class WebParser:
 
         return links
 
+    def _extract_page(self, html, base_url):
+        if self.engine == "lxml":
+            return extract_page(html, base_url)
+
+        soup = BeautifulSoup(html, "lxml")
+        soup = self._clean_soup(soup)
+
+        content = self._extract_text(soup)
+        links = self._extract_links(soup, base_url)
+
+        title = soup.title.string.strip() if soup.title else "No title"
+        meta = soup.find("meta", attrs={"name": "description"})
+        description = meta["content"].strip() if meta else "No description"
+
+        return {
+            "title": title,
+            "description": description,
+            "content": content,
+            "links": links
+        }
+
     # --------------------------------------------------
     # Static Scraping
     # --------------------------------------------------
-    def scrape_with_requests(self, url):
+    def _read_body(self, response, keep_text):
+        """
+        Stream the response body up to max_bytes. lxml parsing happens
+        while bytes arrive; the decoded text is only kept when needed.
+        """
+        content_type = response.headers.get("Content-Type", "")
+        mime = content_type.split(";")[0].strip().lower()
 
-        try:
-            response = requests.get(url, headers=self.headers, timeout=15)
-            response.raise_for_status()
+        if mime and mime not in HTML_CONTENT_TYPES:
+            return {"abort_reason": "content_type", "error": f"Unsupported content type: {mime}"}
+
+        encoding = charset_from_content_type(content_type)
+
+        chunks = []
+        size = 0
+        truncated = False
+        incremental = None
+
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if not chunk:
+                continue
+
+            if size == 0:
+                head = chunk[:4096]
+
+                if not encoding:
+                    encoding = sniff_meta_charset(head) or guess_charset(chunk)
+
+                if not encoding.startswith("utf-16") and b"\x00" in head:
+                    return {"abort_reason": "binary", "error": "Binary content"}
+
+                if self.engine == "lxml":
+                    incremental = feed_parser(encoding)
 
-            soup = BeautifulSoup(response.text, "lxml")
-            soup = self._clean_soup(soup)
+            if size + len(chunk) > self.max_bytes:
+                chunk = chunk[:self.max_bytes - size]
+                truncated = True
 
-            content = self._extract_text(soup)
-            links = self._extract_links(soup, url)
+            size += len(chunk)
 
-            title = soup.title.string.strip() if soup.title else "No title"
-            meta = soup.find("meta", attrs={"name": "description"})
-            description = meta["content"].strip() if meta else "No description"
+            if incremental is not None:
+                incremental.feed(chunk)
+            if keep_text or incremental is None:
+                chunks.append(chunk)
+
+            if truncated:
+                break
+
+        body = {
+            "abort_reason": None,
+            "bytes": size,
+            "truncated": truncated,
+            "root": incremental.close() if incremental is not None else None,
+            "text": None
+        }
+
+        # Also covers a whitespace-only body, where lxml builds no tree
+        if chunks or body["root"] is None:
+            body["text"] = b"".join(chunks).decode(encoding or "utf-8", errors="replace")
+
+        return body
+
+    def scrape_with_requests(self, url, bypass_cache=False):
+
+        try:
+            cache = None if bypass_cache else self.http_cache
+            headers = dict(self.headers)
+            entry = None
+
+            if cache:
+                entry = cache.lookup(url)
+                headers.update(cache.validators(entry))
+
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+
+                if entry and response.status_code == 304:
+                    cache.hit(url)
+
+                    page = entry["pages"].get(self.engine)
+                    if page is None:
+                        page = self._extract_page(entry["body"], url)
+                        entry["pages"][self.engine] = page
+                        cache.save(url, entry)
+
+                    return {
+                        "success": True,
+                        **page,
+                        "method": "requests",
+                        "bytes": 0,
+                        "truncated": entry.get("truncated", False)
+                    }
+
+                response.raise_for_status()
+
+                if entry:
+                    cache.stale()
+
+                body = self._read_body(response, keep_text=cache is not None)
+
+            if body["abort_reason"]:
+                return {
+                    "success": False,
+                    "error": body["error"],
+                    "abort_reason": body["abort_reason"],
+                    "method": "requests"
+                }
+
+            page = self._extract_page(
+                body["root"] if body["root"] is not None else body["text"], url
+            )
+
+            if cache:
+                cache.store_response(
+                    url, response, body["text"], self.engine, page, truncated=body["truncated"]
+                )
 
             return {
                 "success": True,
-                "title": title,
-                "description": description,
-                "content": content,
-                "links": links,
-                "method": "requests"
+                **page,
+                "method": "requests",
+                "bytes": body["bytes"],
+                "truncated": body["truncated"]
             }
 
         except Exception as e:
@@ -94,43 +303,35 @@ class WebParser:
     # --------------------------------------------------
     def scrape_with_selenium(self, url):
 
-        driver = None
-
         try:
 
-            chrome_options = Options()
-            chrome_options.add_argument("--headless=new")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--window-size=1920,1080")
-
-            # Built-in Chrome driver manager (stable)
-            driver = webdriver.Chrome(options=chrome_options)
-
-            driver.get(url)
+            with self.driver_pool.driver() as driver:
+                start = time.perf_counter()
 
-            html = driver.page_source
+                driver.get(url)
+                ready = self.render.wait_until_ready(driver) if self.render else True
 
-            soup = BeautifulSoup(html, "lxml")
-            soup = self._clean_soup(soup)
+                render_ms = (time.perf_counter() - start) * 1000
+                html = driver.page_source
+                title = driver.title
+                stats = page_stats(driver)
 
-            content = self._extract_text(soup)
-            links = self._extract_links(soup, url)
+            page = self._extract_page(html, url)
+            page["title"] = title
 
-            title = driver.title
-            meta = soup.find("meta", attrs={"name": "description"})
-            description = meta["content"].strip() if meta else "No description"
-
-            return {
+            result = {
                 "success": True,
-                "title": title,
-                "description": description,
-                "content": content,
-                "links": links,
-                "method": "selenium"
+                **page,
+                "method": "selenium",
+                "render_ms": round(render_ms, 1),
+                "bytes": stats["bytes"]
             }
 
+            if self.render:
+                result["ready"] = ready
+
+            return result
+
         except Exception as e:
             return {
                 "success": False,
@@ -138,20 +339,206 @@ class WebParser:
                 "method": "selenium"
             }
 
-        finally:
-            if driver:
-                driver.quit()
     # --------------------------------------------------
     # Main entry
     # --------------------------------------------------
-    def scrape(self, url, use_selenium=False):
+    def scrape(self, url, use_selenium=False, bypass_cache=False):
 
         if use_selenium:
             return self.scrape_with_selenium(url)
 
-        result = self.scrape_with_requests(url)
+        if self._route(url) == "selenium":
+            result = self.scrape_with_selenium(url)
 
-        if not result["success"] or len(result["content"]) < 200:
-            return self.scrape_with_selenium(url)
+            if not self._is_usable(result):
+                static = self.scrape_with_requests(url, bypass_cache=bypass_cache)
+                if self._is_usable(static):
+                    result = static
+
+            self._learn_route(url, result)
+            return result
+
+        result = self.scrape_with_requests(url, bypass_cache=bypass_cache)
+
+        if self._needs_selenium(result):
+            result = self.scrape_with_selenium(url)
+
+        self._learn_route(url, result)
+        return result
+
+    def _is_usable(self, result):
+        return result["success"] and len(result["content"]) >= 200
+
+    def _needs_selenium(self, result):
+        # Non-HTML responses would not render any better in a browser
+        return not self._is_usable(result) and not result.get("abort_reason")
+
+    def _route(self, url):
+        return self.router.lookup(url) if self.router else None
 
-        return result
\ No newline at end of file
+    def _learn_route(self, url, result):
+        if not self.router:
+            return
+
+        if self._is_usable(result):
+            self.router.record(url, result["method"])
+        elif result["method"] == "selenium":
+            self.router.forget(url)
+
+    # --------------------------------------------------
+    # Batch scraping
+    # --------------------------------------------------
+    def scrape_many(self, urls, concurrency=8, per_host=2,
+                    selenium_concurrency=None, use_selenium=False,
+                    bypass_cache=False):
+        """
+        Scrape many URLs concurrently, yielding (url, result) pairs as
+        each page completes. `result` has the same shape as scrape().
+
+        concurrency          : max static requests in flight overall
+        per_host             : max pages in flight per host (both lanes)
+        selenium_concurrency : size of the separate Selenium lane (defaults
+                               to the browser pool size); at most this many
+                               more browser-bound URLs wait for it
+
+        `urls` may be any iterable; it is consumed lazily so very long
+        lists are never fully buffered.
+        """
+        url_iter = iter(urls)
+        exhausted = False
+
+        # URLs whose host is saturated wait here, grouped by host
+        host_queues = OrderedDict()
+        host_active = Counter()
+        buffered = 0
+        max_buffered = concurrency * 64
+
+        if selenium_concurrency is None:
+            pool = self._driver_pool
+            selenium_concurrency = pool.size if pool else self._driver_pool_config["size"]
+
+        static_lane = ThreadPoolExecutor(max_workers=concurrency)
+        selenium_lane = ThreadPoolExecutor(max_workers=selenium_concurrency)
+
+        in_flight = {}
+        static_in_flight = 0
+        selenium_in_flight = 0
+
+        # Browser-lane work waiting for a free slot; bounded by the lane
+        # size so routed hosts can't drain the input ahead of the results
+        selenium_waiting = deque()
+
+        def host_of(u):
+            return urlparse(u).netloc.lower()
+
+        def next_ready():
+            nonlocal exhausted, buffered
+
+            for host, queue in host_queues.items():
+                if host_active[host] < per_host:
+                    u = queue.popleft()
+                    buffered -= 1
+                    if not queue:
+                        del host_queues[host]
+                    return u
+
+            while not exhausted and buffered < max_buffered:
+                try:
+                    u = next(url_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                host = host_of(u)
+                if host_active[host] < per_host:
+                    return u
+
+                host_queues.setdefault(host, deque()).append(u)
+                buffered += 1
+
+            return None
+
+        def submit(u, lane, stage, prior=None):
+            nonlocal static_in_flight, selenium_in_flight
+
+            if lane == "selenium":
+                future = selenium_lane.submit(self.scrape_with_selenium, u)
+                selenium_in_flight += 1
+            else:
+                future = static_lane.submit(self.scrape_with_requests, u, bypass_cache)
+                static_in_flight += 1
+
+            in_flight[future] = (u, lane, stage, prior)
+
+        def fill():
+            while selenium_waiting and selenium_in_flight < selenium_concurrency:
+                submit(*selenium_waiting.popleft())
+
+            while (static_in_flight < concurrency
+                   and len(selenium_waiting) < selenium_concurrency):
+                u = next_ready()
+                if u is None:
+                    break
+                host_active[host_of(u)] += 1
+
+                if use_selenium:
+                    stage = "forced"
+                elif self._route(u) == "selenium":
+                    stage = "routed"
+                else:
+                    submit(u, "requests", "static")
+                    continue
+
+                if selenium_in_flight < selenium_concurrency:
+                    submit(u, "selenium", stage)
+                else:
+                    selenium_waiting.append((u, "selenium", stage))
+
+        completed = False
+
+        try:
+            fill()
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    u, lane, stage, prior = in_flight.pop(future)
+
+                    if lane == "requests":
+                        static_in_flight -= 1
+                    else:
+                        selenium_in_flight -= 1
+
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"success": False, "error": str(e), "method": lane}
+
+                    # Follow-up attempts keep the host slot, as in scrape():
+                    # a failed static fetch moves to the browser lane...
+                    if stage == "static" and self._needs_selenium(result):
+                        selenium_waiting.append((u, "selenium", "fallback"))
+                        continue
+
+                    # ...and a failed routed render is retried statically once
+                    if stage == "routed" and not self._is_usable(result):
+                        submit(u, "requests", "recheck", result)
+                        continue
+
+                    if stage == "recheck" and not self._is_usable(result):
+                        result = prior
+
+                    if not use_selenium:
+                        self._learn_route(u, result)
+
+                    host_active[host_of(u)] -= 1
+                    yield u, result
+
+                fill()
+
+            completed = True
+
+        finally:
+            static_lane.shutdown(wait=completed, cancel_futures=not completed)
+            selenium_lane.shutdown(wait=completed, cancel_futures=not completed)
\ No newline at end of file
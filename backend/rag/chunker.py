@@ -0,0 +1,280 @@
+import hashlib
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+TOKEN_RE = re.compile(r"\w+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Prime just above 2**32 for the MinHash permutations
+MINHASH_PRIME = (1 << 32) + 15
+
+
+class Chunker:
+    """
+    Paragraph- and sentence-aware chunker with overlap and duplicate
+    elimination.
+
+    Paragraphs (lines) are packed into chunks of about `target_size`
+    characters or tokens (`unit`). Oversized paragraphs are split at
+    sentence boundaries, and each chunk starts with up to `overlap` units
+    of trailing sentences from the previous one; chunk_spans() also
+    reports how many characters of each chunk were carried over.
+
+    Exact duplicates (normalised text hash) and near duplicates (MinHash
+    over word shingles with LSH banding, estimated Jaccard >=
+    `similarity_threshold`) are dropped. chunk() returns the chunks and a
+    stats dict describing how much the index shrank.
+    """
+
+    def __init__(self, target_size: int = 800, overlap: int = 100, unit: str = "chars",
+                 min_size: int = 40, dedupe: bool = True, similarity_threshold: float = 0.8,
+                 num_perm: int = 64, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown chunk unit: {unit}")
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.target_size = target_size
+        self.overlap = overlap
+        self.unit = unit
+        self.min_size = min_size
+        self.dedupe = dedupe
+        self.similarity_threshold = similarity_threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._perm_a = rng.integers(1, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+        self._perm_b = rng.integers(0, 1 << 31, size=(num_perm, 1), dtype=np.uint64)
+
+    def _size(self, text: str) -> int:
+        if self.unit == "tokens":
+            return len(TOKEN_RE.findall(text))
+        return len(text)
+
+    # =========================
+    # Splitting
+    # =========================
+    def _segments(self, paragraph: str) -> List[str]:
+        """
+        Split a paragraph into pieces no larger than target_size,
+        preferring sentence boundaries and falling back to words.
+        """
+        if self._size(paragraph) <= self.target_size:
+            return [paragraph]
+
+        pieces = []
+        for sentence in SENTENCE_RE.split(paragraph):
+            if self._size(sentence) <= self.target_size:
+                pieces.append(sentence)
+                continue
+
+            current = []
+            for word in sentence.split():
+                if current and self._size(" ".join(current + [word])) > self.target_size:
+                    pieces.append(" ".join(current))
+                    current = []
+                current.append(word)
+            if current:
+                pieces.append(" ".join(current))
+
+        return pieces
+
+    def _tail(self, text: str, budget: int) -> str:
+        """
+        Trailing sentences of `text` that fit in `budget` units, or
+        trailing words when even the last sentence is too long.
+        """
+        for pieces, sep in ((SENTENCE_RE.split(text), " "), (text.split(), " ")):
+            kept = []
+            used = 0
+            for piece in reversed(pieces):
+                size = self._size(piece)
+                if used + size > budget:
+                    break
+                kept.insert(0, piece)
+                used += size
+            if kept:
+                return sep.join(kept)
+        return ""
+
+    def split(self, content: str) -> List[str]:
+        return [text for text, _ in self.split_spans(content)]
+
+    def split_spans(self, content: str) -> List[Tuple[str, int]]:
+        """(chunk, length of its carried-over prefix) pairs"""
+        paragraphs = [line.strip() for line in content.split("\n") if line.strip()]
+
+        # (text, starts_paragraph) units in reading order
+        units: List[Tuple[str, bool]] = []
+        for paragraph in paragraphs:
+            for i, segment in enumerate(self._segments(paragraph)):
+                units.append((segment, i == 0))
+
+        chunks = []
+        current: List[Tuple[str, bool]] = []
+        current_size = 0
+        fresh = 0
+        carried_chars = 0
+
+        def render(parts):
+            text = ""
+            for segment, new_paragraph in parts:
+                if text:
+                    text += "\n" if new_paragraph else " "
+                text += segment
+            return text
+
+        for unit in units:
+            size = self._size(unit[0])
+
+            if current and fresh and current_size + size > self.target_size:
+                chunks.append((render(current), carried_chars))
+
+                # Carry trailing units into the next chunk as overlap; the
+                # unit that doesn't fit whole contributes its last
+                # sentences (or words)
+                carried = []
+                carried_size = 0
+                for prev in reversed(current):
+                    prev_size = self._size(prev[0])
+                    if carried_size + prev_size > self.overlap:
+                        tail = self._tail(prev[0], self.overlap - carried_size)
+                        if tail:
+                            carried.insert(0, (tail, False))
+                            carried_size += self._size(tail)
+                        break
+                    carried.insert(0, prev)
+                    carried_size += prev_size
+
+                current = carried
+                current_size = carried_size
+                fresh = 0
+                # Carried text plus the separator before the next unit
+                carried_chars = len(render(carried)) + 1 if carried else 0
+
+            current.append(unit)
+            current_size += size
+            fresh += 1
+
+        if current and fresh:
+            chunks.append((render(current), carried_chars))
+
+        return [c for c in chunks if len(c[0]) > self.min_size]
+
+    # =========================
+    # Deduplication
+    # =========================
+    @staticmethod
+    def _normalise(text: str) -> str:
+        return " ".join(TOKEN_RE.findall(text.lower()))
+
+    def _minhash(self, text: str) -> np.ndarray:
+        words = TOKEN_RE.findall(text.lower())
+        n = self.shingle_size
+
+        if len(words) <= n:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+        return ((self._perm_a * hashes + self._perm_b) % MINHASH_PRIME).min(axis=1)
+
+    def deduplicate(self, chunks: List[str]) -> Tuple[List[str], Dict]:
+        kept, counts = self._unique(chunks)
+        return [chunks[i] for i in kept], counts
+
+    def _unique(self, chunks: List[str]) -> Tuple[List[int], Dict]:
+        """Indices of the chunks that survive deduplication"""
+        seen_exact = set()
+        buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        signatures: List[np.ndarray] = []
+        rows = self.num_perm // self.bands
+
+        kept = []
+        exact = 0
+        near = 0
+
+        for i, text in enumerate(chunks):
+            digest = hashlib.sha1(self._normalise(text).encode("utf-8")).digest()
+            if digest in seen_exact:
+                exact += 1
+                continue
+            seen_exact.add(digest)
+
+            signature = self._minhash(text)
+            band_keys = [signature[i * rows:(i + 1) * rows].tobytes() for i in range(self.bands)]
+
+            candidates = set()
+            for band, key in enumerate(band_keys):
+                candidates.update(buckets[band].get(key, ()))
+
+            if any(
+                np.mean(signatures[c] == signature) >= self.similarity_threshold
+                for c in candidates
+            ):
+                near += 1
+                continue
+
+            index = len(signatures)
+            signatures.append(signature)
+            for band, key in enumerate(band_keys):
+                buckets[band].setdefault(key, []).append(index)
+
+            kept.append(i)
+
+        return kept, {"exact_duplicates": exact, "near_duplicates": near}
+
+    # =========================
+    # Entry point
+    # =========================
+    def chunk(self, content: str) -> Tuple[List[str], Dict]:
+        spans, stats = self.chunk_spans(content)
+        return [text for text, _ in spans], stats
+
+    def chunk_spans(self, content: str) -> Tuple[List[Tuple[str, int]], Dict]:
+        """Like chunk(), with each chunk's carried-over prefix length"""
+        lines = [line.strip() for line in content.split("\n") if line.strip()]
+        legacy_chunks = sum(1 for line in lines if len(line) > 40)
+
+        exact = near = 0
+
+        # Boilerplate repeats line by line (banners, cards), so drop
+        # duplicate paragraphs before packing, then duplicate chunks after
+        if self.dedupe:
+            lines, counts = self.deduplicate(lines)
+            exact += counts["exact_duplicates"]
+            near += counts["near_duplicates"]
+
+        spans = self.split_spans("\n".join(lines))
+        before = len(spans)
+
+        if self.dedupe:
+            kept, counts = self._unique([text for text, _ in spans])
+            spans = [spans[i] for i in kept]
+            exact += counts["exact_duplicates"]
+            near += counts["near_duplicates"]
+
+        stats = {
+            "input_lines": len(content.split("\n")),
+            "legacy_chunks": legacy_chunks,
+            "chunks_before_dedupe": before,
+            "chunks": len(spans),
+            "exact_duplicates": exact,
+            "near_duplicates": near,
+            "chars_in": len(content),
+            "chars_indexed": sum(len(text) for text, _ in spans)
+        }
+
+        return spans, stats
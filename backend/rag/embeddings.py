@@ -0,0 +1,58 @@
+import re
+import zlib
+from typing import List
+
+import numpy as np
+
+
+class HashingEmbedder:
+    """
+    Dependency-light local text embeddings.
+
+    Character n-grams are hashed (signed) into a fixed number of
+    dimensions and L2-normalised, so cosine similarity is a plain dot
+    product. Runs on CPU with no model download or network access, and
+    tolerates paraphrase, inflection and typos better than exact
+    keyword matching.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str):
+        text = " " + re.sub(r"\s+", " ", text.lower()).strip() + " "
+        data = text.encode("utf-8")
+
+        indices = []
+        signs = []
+
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(len(data) - n + 1):
+                h = zlib.crc32(data[i:i + n], n)
+                indices.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+
+        return indices, signs
+
+    def embed(self, text: str) -> np.ndarray:
+        indices, signs = self._features(text)
+
+        vec = np.bincount(
+            np.asarray(indices, dtype=np.int64),
+            weights=np.asarray(signs, dtype=np.float64),
+            minlength=self.dim
+        ).astype(np.float32)
+
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into one contiguous (len(texts), dim) float32 matrix."""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.embed(text)
+        return matrix
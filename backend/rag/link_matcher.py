@@ -0,0 +1,99 @@
+from collections import deque
+from typing import Dict, List
+
+
+class LinkMatcher:
+    """
+    Aho-Corasick matcher over link anchor texts.
+
+    Equivalent to `[l for l in links if l["text"].lower() in text.lower()]`
+    but scans each text once, whatever the number of links. Matches are
+    returned in the original link order, duplicates included.
+    """
+
+    def __init__(self, links: List[Dict]):
+        self.links = links
+
+        # Trie: per-node transitions, failure links and matched pattern ids
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        # pattern id -> indices of links sharing that anchor text
+        self._pattern_links: List[List[int]] = []
+        self._always: List[int] = []
+
+        pattern_ids: Dict[str, int] = {}
+
+        for idx, link in enumerate(links):
+            pattern = link["text"].lower()
+
+            # "" is a substring of everything
+            if not pattern:
+                self._always.append(idx)
+                continue
+
+            pid = pattern_ids.get(pattern)
+            if pid is None:
+                pid = len(self._pattern_links)
+                pattern_ids[pattern] = pid
+                self._pattern_links.append([])
+                self._insert(pattern, pid)
+
+            self._pattern_links[pid].append(idx)
+
+        self._build_failure_links()
+
+    def _insert(self, pattern: str, pid: int) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(pid)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+
+                # Inherit matches that end at the failure state
+                if self._out[self._fail[child]]:
+                    self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def match(self, text: str) -> List[Dict]:
+        goto, fail, out = self._goto, self._fail, self._out
+
+        found = set()
+        state = 0
+
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            if out[state]:
+                found.update(out[state])
+
+        indices = list(self._always)
+        for pid in found:
+            indices.extend(self._pattern_links[pid])
+        indices.sort()
+
+        return [self.links[i] for i in indices]
@@ -1,5 +1,18 @@
+import heapq
+import math
 import re
-from typing import List, Dict
+from collections import Counter, OrderedDict, defaultdict
+from typing import List, Dict, Optional, Iterable, Union
+from urllib.parse import urlparse
+
+import numpy as np
+
+from backend.rag.chunker import Chunker
+from backend.rag.embeddings import HashingEmbedder
+from backend.rag.link_matcher import LinkMatcher
+
+
+TOKEN_RE = re.compile(r"\w+")
 
 
 class RAGEngine:
@@ -9,77 +22,464 @@ class RAGEngine:
     Responsibilities:
     - Chunk scraped content
     - Associate chunks with hyperlinks
-    - Retrieve relevant chunks for a query
+    - Retrieve relevant chunks for a query (BM25 over an inverted index)
     - Return grounded answers with clickable sources
+
+    The engine holds a corpus of documents keyed by URL. Documents can be
+    added, updated or removed at any time; the index is maintained
+    incrementally, so each change costs time proportional to that page.
+    Every chunk carries its source `url`, page `title` and `site`, and
+    retrieval can be filtered by site or document.
+
+    With hybrid=True, chunks are also embedded locally (HashingEmbedder)
+    and the dense cosine score is fused with the normalised BM25 score:
+    fused = alpha * dense + (1 - alpha) * sparse.
+
+    Pass a `chunker` (Chunker) for size-targeted, overlapping chunks with
+    duplicate removal; its per-document stats are kept in `chunk_stats`.
+    Without one, every line over 40 characters is a chunk.
+
+    Retrieval results are kept in an LRU cache of `cache_size` entries
+    (0 disables it), keyed on the normalised query, top_k and filters.
     """
 
-    def __init__(self, content: str, links: List[Dict]):
-        self.content = content
-        self.links = links
-        self.chunks = self._build_chunks()
+    def __init__(self, content: str = "", links: Optional[List[Dict]] = None,
+                 k1: float = 1.5, b: float = 0.75,
+                 hybrid: bool = False, alpha: float = 0.5,
+                 embedder: Optional[HashingEmbedder] = None, min_similarity: float = 0.15,
+                 url: str = "", title: str = "", chunker: Optional[Chunker] = None,
+                 cache_size: int = 256):
+        self.k1 = k1
+        self.b = b
+        self.hybrid = hybrid
+        self.alpha = alpha
+        self.min_similarity = min_similarity
+        self.chunker = chunker
+        self.chunk_stats: Dict[str, Dict] = {}
+
+        # Query-result LRU; any corpus change bumps `version`, which
+        # invalidates everything cached under the previous version
+        self.version = 0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+        self._cache_version = 0
+        self.cache_stats = {"hits": 0, "misses": 0}
+
+        # Corpus: chunk id -> chunk, url -> document, site -> urls
+        self.chunks: Dict[int, Dict] = {}
+        self.documents: Dict[str, Dict] = {}
+        self.sites: Dict[str, set] = defaultdict(set)
+        self._next_chunk_id = 0
+
+        # Sparse index: term -> {chunk id: tf}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self._chunk_terms: Dict[int, tuple] = {}
+        self._total_length = 0
+
+        # Dense index: one row per chunk in a growable float32 matrix
+        self.embedder = None
+        self.embeddings = None
+        self._row_of: Dict[int, int] = {}
+        self._row_chunk = np.empty(0, dtype=np.int64)
+        self._free_rows: List[int] = []
+        self._n_rows = 0
+
+        if hybrid:
+            self.embedder = embedder or HashingEmbedder()
+            self.embeddings = np.zeros((0, self.embedder.dim), dtype=np.float32)
+
+        if content:
+            self.add_document(url, content, links or [], title=title)
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        return TOKEN_RE.findall(text.lower())
+
+    @staticmethod
+    def _site_of(url: str) -> str:
+        host = urlparse(url).netloc if "://" in url else url
+        host = host.lower()
+        return host[4:] if host.startswith("www.") else host
+
+    @property
+    def avg_doc_length(self) -> float:
+        return self._total_length / len(self.chunks) if self.chunks else 0.0
 
     # =========================
     # Chunking
     # =========================
-    def _build_chunks(self) -> List[Dict]:
+    def _build_chunks(self, content: str, links: List[Dict], url: str = "") -> List[Dict]:
         """
         Create text chunks and associate them with nearby links.
         """
-        paragraphs = [
-            p.strip() for p in self.content.split("\n")
-            if len(p.strip()) > 40
-        ]
+        if self.chunker:
+            spans, self.chunk_stats[url] = self.chunker.chunk_spans(content)
+        else:
+            spans = [
+                (p.strip(), 0) for p in content.split("\n")
+                if len(p.strip()) > 40
+            ]
 
-        chunks = []
-        for para in paragraphs:
-            matched_links = []
-            for link in self.links:
-                if link["text"].lower() in para.lower():
-                    matched_links.append(link)
+        matcher = LinkMatcher(links)
 
+        chunks = []
+        for para, overlap in spans:
             chunks.append({
                 "text": para,
-                "links": matched_links
+                "links": matcher.match(para),
+                # Characters carried over from the previous chunk
+                "overlap": overlap
             })
 
         return chunks
 
+    # =========================
+    # Corpus management
+    # =========================
+    def add_document(self, url: str, content: str, links: List[Dict], title: str = "") -> int:
+        """
+        Add a page to the corpus, replacing any previous version of the
+        same URL. Returns the number of chunks indexed.
+        """
+        if url in self.documents:
+            self.remove_document(url)
+
+        site = self._site_of(url)
+        chunk_ids = []
+
+        chunks = self._build_chunks(content, links, url)
+        vectors = None
+        if self.hybrid and chunks:
+            vectors = self.embedder.embed_many([c["text"] for c in chunks])
+
+        for pos, chunk in enumerate(chunks):
+            cid = self._next_chunk_id
+            self._next_chunk_id += 1
+
+            chunk.update({"url": url, "title": title, "site": site})
+            self.chunks[cid] = chunk
+            chunk_ids.append(cid)
+
+            self._index_chunk(cid, chunk["text"])
+            if vectors is not None:
+                self._add_vector(cid, vectors[pos])
+
+        self.documents[url] = {"title": title, "site": site, "chunk_ids": chunk_ids}
+        self.sites[site].add(url)
+        self.version += 1
+
+        return len(chunk_ids)
+
+    def remove_document(self, url: str) -> bool:
+        document = self.documents.pop(url, None)
+        if document is None:
+            return False
+
+        self.chunk_stats.pop(url, None)
+        self.version += 1
+
+        for cid in document["chunk_ids"]:
+            self._unindex_chunk(cid)
+            if self.hybrid:
+                self._remove_vector(cid)
+            del self.chunks[cid]
+
+        urls = self.sites.get(document["site"])
+        if urls is not None:
+            urls.discard(url)
+            if not urls:
+                del self.sites[document["site"]]
+
+        return True
+
+    def _index_chunk(self, cid: int, text: str) -> None:
+        terms = self._tokenize(text)
+        counts = Counter(terms)
+
+        self.doc_lengths[cid] = len(terms)
+        self._chunk_terms[cid] = tuple(counts)
+        self._total_length += len(terms)
+
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[cid] = tf
+
+    def _unindex_chunk(self, cid: int) -> None:
+        for term in self._chunk_terms.pop(cid, ()):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(cid, None)
+            if not postings:
+                del self.postings[term]
+
+        self._total_length -= self.doc_lengths.pop(cid, 0)
+
+    def _add_vector(self, cid: int, vector: np.ndarray) -> None:
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = self._n_rows
+            self._n_rows += 1
+
+            if row >= len(self.embeddings):
+                capacity = max(64, 2 * len(self.embeddings))
+                grown = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+                grown[:len(self.embeddings)] = self.embeddings
+                self.embeddings = grown
+
+                row_chunk = np.full(capacity, -1, dtype=np.int64)
+                row_chunk[:len(self._row_chunk)] = self._row_chunk
+                self._row_chunk = row_chunk
+
+        self.embeddings[row] = vector
+        self._row_chunk[row] = cid
+        self._row_of[cid] = row
+
+    def _remove_vector(self, cid: int) -> None:
+        row = self._row_of.pop(cid, None)
+        if row is None:
+            return
+
+        # A zero row never scores above zero, so it drops out of results
+        self.embeddings[row] = 0.0
+        self._row_chunk[row] = -1
+        self._free_rows.append(row)
+
+    def index_stats(self) -> Dict:
+        """
+        Corpus size and, with a chunker, how much chunking and
+        deduplication shrank it compared with one chunk per line.
+        """
+        stats = {
+            "documents": len(self.documents),
+            "chunks": len(self.chunks),
+            "terms": len(self.postings)
+        }
+
+        if self.chunk_stats:
+            totals = Counter()
+            for doc_stats in self.chunk_stats.values():
+                totals.update(doc_stats)
+
+            stats.update(totals)
+            if totals["legacy_chunks"]:
+                stats["chunk_reduction"] = 1 - totals["chunks"] / totals["legacy_chunks"]
+
+        return stats
+
+    # =========================
+    # Query cache
+    # =========================
+    @staticmethod
+    def _cache_key(query: str, top_k: int, site: Optional[str],
+                   url: Union[str, Iterable[str], None]) -> tuple:
+        if url is not None and not isinstance(url, str):
+            url = tuple(sorted(url))
+        return (" ".join(query.lower().split()), top_k, site, url)
+
+    def _cache_get(self, key: tuple) -> Optional[List[Dict]]:
+        if not self.cache_size:
+            return None
+
+        if self._cache_version != self.version:
+            self._cache.clear()
+            self._cache_version = self.version
+
+        found = self._cache.get(key)
+        if found is None:
+            self.cache_stats["misses"] += 1
+            return None
+
+        self._cache.move_to_end(key)
+        self.cache_stats["hits"] += 1
+        return list(found)
+
+    def _cache_put(self, key: tuple, results: List[Dict]) -> None:
+        if not self.cache_size:
+            return
+
+        self._cache[key] = results
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def cache_hit_rate(self) -> float:
+        total = self.cache_stats["hits"] + self.cache_stats["misses"]
+        return self.cache_stats["hits"] / total if total else 0.0
+
+    # =========================
+    # Filtering
+    # =========================
+    def _allowed_chunks(self, site: Optional[str] = None,
+                        url: Union[str, Iterable[str], None] = None) -> Optional[set]:
+        """
+        Chunk ids allowed by the site / document filters, or None when
+        unfiltered.
+        """
+        if site is None and url is None:
+            return None
+
+        if url is not None:
+            urls = {url} if isinstance(url, str) else set(url)
+        else:
+            urls = set(self.documents)
+
+        if site is not None:
+            urls &= self.sites.get(self._site_of(site), set())
+
+        allowed = set()
+        for u in urls:
+            document = self.documents.get(u)
+            if document:
+                allowed.update(document["chunk_ids"])
+
+        return allowed
+
     # =========================
     # Retrieval
     # =========================
-    def retrieve(self, query: str, top_k: int = 5) -> List[Dict]:
+    def _bm25_scores(self, query_terms, allowed: Optional[set] = None) -> Dict[int, float]:
         """
-        Retrieve relevant chunks based on keyword overlap.
+        BM25 score for every chunk containing at least one query term.
         """
-        query_terms = set(
-            re.findall(r"\w+", query.lower())
-        )
+        scores: Dict[int, float] = defaultdict(float)
+        n_docs = len(self.chunks)
+        avg_len = self.avg_doc_length or 1.0
+
+        for term in query_terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
 
-        scored = []
-        for chunk in self.chunks:
-            chunk_terms = set(
-                re.findall(r"\w+", chunk["text"].lower())
-            )
-            score = len(query_terms & chunk_terms)
+            for cid, tf in postings.items():
+                if allowed is not None and cid not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[cid] / avg_len)
+                scores[cid] += idf * tf * (self.k1 + 1) / (tf + norm)
 
-            if score > 0:
-                scored.append({
-                    "score": score,
-                    "text": chunk["text"],
-                    "links": chunk["links"]
-                })
+        return scores
 
-        scored.sort(key=lambda x: x["score"], reverse=True)
-        return scored[:top_k]
+    def _result(self, cid: int, score: float) -> Dict:
+        chunk = self.chunks[cid]
+        return {
+            "score": score,
+            "text": chunk["text"],
+            "overlap": chunk["overlap"],
+            "links": chunk["links"],
+            "url": chunk["url"],
+            "title": chunk["title"]
+        }
+
+    def retrieve(self, query: str, top_k: int = 5, site: Optional[str] = None,
+                 url: Union[str, Iterable[str], None] = None) -> List[Dict]:
+        """
+        Retrieve the top_k chunks for a query, ranked by BM25.
+        Only chunks sharing a term with the query are scored.
+        In hybrid mode the dense score is fused in (see retrieve_many).
+        """
+        return self.retrieve_many([query], top_k=top_k, site=site, url=url)[0]
+
+    def retrieve_many(self, queries: List[str], top_k: int = 5, site: Optional[str] = None,
+                      url: Union[str, Iterable[str], None] = None) -> List[List[Dict]]:
+        """
+        Retrieve for a batch of queries. Repeated queries are served from
+        the result cache; in hybrid mode the remaining query vectors are
+        scored against the chunk matrix with a single matmul.
+        """
+        # Materialise once: an iterator would be used up by the first key
+        if url is not None and not isinstance(url, str):
+            url = tuple(sorted(set(url)))
+
+        results: List[Optional[List[Dict]]] = [None] * len(queries)
+        keys = [self._cache_key(q, top_k, site, url) for q in queries]
+        missing = []
+
+        for i, key in enumerate(keys):
+            cached = self._cache_get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                results[i] = cached
+
+        if missing:
+            allowed = self._allowed_chunks(site, url)
+            pending = [queries[i] for i in missing]
+
+            if self.hybrid:
+                fresh = self._search_hybrid(pending, top_k, allowed)
+            else:
+                fresh = [self._search_sparse(q, top_k, allowed) for q in pending]
+
+            for i, found in zip(missing, fresh):
+                self._cache_put(keys[i], found)
+                results[i] = list(found)
+
+        return results
+
+    def _search_sparse(self, query: str, top_k: int, allowed: Optional[set]) -> List[Dict]:
+        query_terms = set(self._tokenize(query))
+        scores = self._bm25_scores(query_terms, allowed)
+
+        # Ties keep corpus order
+        best = heapq.nlargest(top_k, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+
+        return [self._result(cid, score) for cid, score in best]
+
+    def _search_hybrid(self, queries: List[str], top_k: int,
+                       allowed: Optional[set]) -> List[List[Dict]]:
+        n_rows = self._n_rows
+        if not self.chunks or top_k <= 0:
+            return [[] for _ in queries]
+
+        mask = None
+        if allowed is not None:
+            mask = np.zeros(n_rows, dtype=bool)
+            mask[[self._row_of[cid] for cid in allowed]] = True
+
+        query_vectors = self.embedder.embed_many(queries)
+        dense = query_vectors @ self.embeddings[:n_rows].T
+
+        results = []
+        for row, query in enumerate(queries):
+            sparse = np.zeros(n_rows, dtype=np.float32)
+            for cid, score in self._bm25_scores(set(self._tokenize(query)), allowed).items():
+                sparse[self._row_of[cid]] = score
+
+            if sparse.max() > 0:
+                sparse /= sparse.max()
+
+            similarity = np.clip(dense[row], 0.0, None)
+            fused = self.alpha * similarity + (1 - self.alpha) * sparse
+
+            # Chunks with neither a keyword hit nor a close embedding are dropped
+            fused[(sparse == 0) & (similarity < self.min_similarity)] = 0.0
+            if mask is not None:
+                fused[~mask] = 0.0
+
+            k = min(top_k, n_rows)
+            top = np.argpartition(-fused, k - 1)[:k]
+            top = top[np.lexsort((self._row_chunk[top], -fused[top]))]
+
+            results.append([
+                self._result(int(self._row_chunk[r]), float(fused[r]))
+                for r in top if fused[r] > 0
+            ])
+
+        return results
 
     # =========================
     # Answer Formatting
     # =========================
-    def build_answer(self, query: str) -> Dict:
+    def build_answer(self, query: str, site: Optional[str] = None,
+                     url: Union[str, Iterable[str], None] = None) -> Dict:
         """
         Build a grounded answer with hyperlinks.
         """
-        results = self.retrieve(query)
+        results = self.retrieve(query, site=site, url=url)
 
         if not results:
             return {
@@ -91,8 +491,16 @@ class RAGEngine:
         answer_parts = []
         sources = []
 
+        # Preview a whole chunk, leaving out the text carried over from
+        # the previous one
+        preview = 300
+        if self.chunker and self.chunker.unit == "chars":
+            preview = max(preview, self.chunker.target_size)
+
         for idx, r in enumerate(results, start=1):
-            answer_parts.append(f"{idx}. {r['text'][:300]}...")
+            text = r["text"][r["overlap"]:]
+            ellipsis = "..." if len(text) > preview else ""
+            answer_parts.append(f"{idx}. {text[:preview]}{ellipsis}")
             for link in r["links"]:
                 sources.append(link)
 
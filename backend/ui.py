@@ -21,3 +21,11 @@ def badge(text):
         {text}
     </span>
     """
+
+def call_timing_caption(call):
+    if "total_ms" not in call:
+        return ""
+    text = f"First token {call['ttft_ms']:.0f} ms · total {call['total_ms']:.0f} ms"
+    if call.get("cached"):
+        text += " · cached"
+    return text
@@ -0,0 +1,85 @@
+"""
+Compare WebParser extraction engines (BeautifulSoup vs single-pass lxml).
+
+Usage:
+    python -m benchmarks.bench_extraction [--sections N] [--repeat R] [FILE ...]
+
+Without files a synthetic page with N article sections is used. Each
+engine is timed on the same markup and the outputs are checked for
+equality.
+"""
+import argparse
+import time
+
+from backend.parser import WebParser
+
+
+BASE_URL = "https://example.com/articles/"
+
+
+def synthetic_page(sections):
+    parts = [
+        "<!DOCTYPE html><html><head>",
+        "<title> Benchmark page </title>",
+        '<meta name="description" content=" Synthetic benchmark page ">',
+        "<style>body { color: red; }</style>",
+        "<script>var tracking = 1;</script>",
+        "</head><body>",
+        "<nav><a href='/home'>Home</a><a href='/about'>About</a></nav>",
+    ]
+
+    for i in range(sections):
+        parts.append(
+            f"<section><h2>Section {i}</h2>"
+            f"<p>Paragraph {i} with <b>bold</b> text and <a href='/item/{i}'>item {i}</a> "
+            f"and an <a href='https://other.example.org/{i}#frag'>external link</a>.</p>"
+            f"<!-- comment {i} --><ul><li>one</li><li>two <i>{i}</i></li></ul>"
+            f"<aside>related {i}</aside></section>"
+        )
+
+    parts.append("<footer>Footer text <a href='/terms'>Terms</a></footer></body></html>")
+    return "".join(parts)
+
+
+def time_engine(engine, html, repeat):
+    parser = WebParser(engine=engine, router=False)
+
+    best = float("inf")
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parser._extract_page(html, BASE_URL)
+        best = min(best, time.perf_counter() - start)
+
+    parser.close()
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("files", nargs="*", help="HTML files to benchmark")
+    ap.add_argument("--sections", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    pages = []
+    if args.files:
+        for path in args.files:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append((path, f.read()))
+    else:
+        pages.append((f"synthetic ({args.sections} sections)", synthetic_page(args.sections)))
+
+    for name, html in pages:
+        bs4_time, bs4_result = time_engine("bs4", html, args.repeat)
+        lxml_time, lxml_result = time_engine("lxml", html, args.repeat)
+
+        print(f"{name}: {len(html) / 1024:.0f} KiB")
+        print(f"  bs4  : {bs4_time * 1000:8.1f} ms")
+        print(f"  lxml : {lxml_time * 1000:8.1f} ms  ({bs4_time / lxml_time:.1f}x)")
+        print(f"  identical output: {bs4_result == lxml_result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare naive link-to-paragraph association with the Aho-Corasick
+LinkMatcher used by RAGEngine._build_chunks.
+
+Usage:
+    python -m benchmarks.bench_link_matching [--links N] [--paragraphs P]
+
+Builds a synthetic link-dense page (catalog / news index style), times
+both approaches and checks they associate exactly the same links.
+"""
+import argparse
+import random
+import time
+
+from backend.rag.link_matcher import LinkMatcher
+
+
+WORDS = (
+    "market price product review news update guide sale offer city world "
+    "sport travel health science music video photo design home garden "
+    "phone laptop camera watch shoes jacket coffee book series season"
+).split()
+
+
+def synthetic_page(n_links, n_paragraphs, seed=7):
+    rng = random.Random(seed)
+
+    links = [
+        {"text": " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(1, 4))) + f" {i}",
+         "url": f"https://example.com/item/{i}"}
+        for i in range(n_links)
+    ]
+
+    paragraphs = []
+    for _ in range(n_paragraphs):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 80))]
+        for link in rng.sample(links, 3):
+            words.insert(rng.randrange(len(words)), link["text"])
+        paragraphs.append(" ".join(words))
+
+    return links, paragraphs
+
+
+def naive(links, paragraphs):
+    result = []
+    for para in paragraphs:
+        result.append([l for l in links if l["text"].lower() in para.lower()])
+    return result
+
+
+def aho_corasick(links, paragraphs):
+    matcher = LinkMatcher(links)
+    return [matcher.match(para) for para in paragraphs]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--links", type=int, default=5000)
+    ap.add_argument("--paragraphs", type=int, default=2000)
+    args = ap.parse_args()
+
+    links, paragraphs = synthetic_page(args.links, args.paragraphs)
+
+    start = time.perf_counter()
+    expected = naive(links, paragraphs)
+    naive_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = aho_corasick(links, paragraphs)
+    ac_time = time.perf_counter() - start
+
+    print(f"{args.links} links x {args.paragraphs} paragraphs")
+    print(f"  naive        : {naive_time:8.2f} s")
+    print(f"  aho-corasick : {ac_time:8.2f} s  ({naive_time / ac_time:.0f}x)")
+    print(f"  identical output: {expected == actual}")
+
+
+if __name__ == "__main__":
+    main()
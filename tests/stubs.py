@@ -0,0 +1,30 @@
+class StubResponse:
+    status_code = 200
+
+    def __init__(self, body, content_type="text/html"):
+        self.body = body
+        self.headers = {"Content-Type": content_type}
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class StubSession:
+    def __init__(self, response):
+        self.response = response
+
+    def get(self, url, **kwargs):
+        return self.response
+
+    def close(self):
+        pass
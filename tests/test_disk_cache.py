@@ -0,0 +1,23 @@
+from backend.cache.disk_cache import DiskCache
+
+
+def test_size_cap_shared_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = DiskCache(path, max_bytes=1000)
+    second = DiskCache(path, max_bytes=1000)
+
+    for i in range(20):
+        cache = first if i % 2 else second
+        cache.set(f"key-{i}", b"x" * 100)
+
+    # Measured from the file, not either instance's own view
+    assert len(first) <= 10
+    fresh = DiskCache(path, max_bytes=1000)
+    assert fresh.size_bytes() <= 1000
+    fresh.close()
+    # The most recent entries survive eviction
+    assert first.get("key-19") is not None
+    assert second.get("key-18") is not None
+
+    first.close()
+    second.close()
@@ -0,0 +1,47 @@
+from backend.parser import WebParser
+
+from stubs import StubResponse, StubSession
+
+
+def scrape(body, engine):
+    parser = WebParser(session=StubSession(StubResponse(body)), router=False, engine=engine)
+    return parser.scrape_with_requests("http://example.com/")
+
+
+def test_utf8_bom_without_charset_header():
+    body = "﻿<html><head><title>Café</title></head><body><p>Grüße aus Köln</p></body></html>"
+
+    for engine in ("bs4", "lxml"):
+        result = scrape(body.encode("utf-8"), engine)
+        assert result["success"], result
+        assert result["title"] == "Café"
+        assert "Grüße aus Köln" in result["content"]
+
+
+def test_euc_jp_meta_charset():
+    body = (
+        '<html><head><meta charset="EUC-JP"><title>日本語のページ</title></head>'
+        "<body><p>こんにちは世界</p></body></html>"
+    )
+
+    for engine in ("bs4", "lxml"):
+        result = scrape(body.encode("euc_jp"), engine)
+        assert result["success"], result
+        assert result["title"] == "日本語のページ"
+        assert "こんにちは世界" in result["content"]
+
+
+def test_unlabelled_latin1_body():
+    body = b"<html><body><p>caf\xe9 na\xefve</p></body></html>"
+
+    for engine in ("bs4", "lxml"):
+        result = scrape(body, engine)
+        assert result["success"], result
+        assert "café naïve" in result["content"]
+
+
+def test_whitespace_only_body():
+    for engine in ("bs4", "lxml"):
+        result = scrape(b"  \n\t ", engine)
+        assert result["success"], result
+        assert result["content"] == ""
@@ -0,0 +1,26 @@
+from backend.parser import WebParser
+
+from stubs import StubResponse, StubSession
+
+
+def test_selenium_lane_consumes_input_lazily():
+    pulled = []
+
+    def urls():
+        for i in range(5000):
+            pulled.append(i)
+            yield f"http://example{i % 50}.com/page/{i}"
+
+    parser = WebParser(session=StubSession(StubResponse(b"<html></html>")), router=False)
+    parser.scrape_with_selenium = lambda url: {
+        "success": True, "title": "t", "description": "", "content": "c " * 50,
+        "links": [], "method": "selenium"
+    }
+
+    results = parser.scrape_many(urls(), use_selenium=True, selenium_concurrency=2)
+    url, result = next(results)
+    results.close()
+
+    assert result["success"], result
+    # The lane's slots plus as many waiting, never the whole input
+    assert len(pulled) <= 2 * 2 + 1